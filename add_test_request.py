@@ -3,50 +3,40 @@
 Add a test blood request to verify filtering works
 """
 
-import sqlite3
 from datetime import datetime, timedelta
 
+from app import app, db, BloodRequest
+
 def add_test_request():
     """Add a test blood request"""
-    try:
-        conn = sqlite3.connect('instance/blood_finder.db')
-        cursor = conn.cursor()
-        
-        # Add a new test request
-        needed_date = (datetime.now() + timedelta(days=3)).isoformat()
-        request_date = datetime.now().isoformat()
-        
-        cursor.execute("""
-            INSERT INTO blood_request (
-                receiver_id, blood_group_needed, quantity_needed, urgency,
-                hospital_name, hospital_location, contact_person, contact_number,
-                needed_by_date, additional_notes, request_date, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            3,  # jack's receiver ID
-            'A+',  # Compatible with akash's O+ blood
-            '2 units (450ml)',
-            'High',
-            'Test Hospital',
-            'Test Location',
-            'Test Person',
-            '1234567890',
-            needed_date,
-            'Test request to verify filtering works',
-            request_date,
-            'Active'
-        ))
-        
-        request_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        print(f"✅ Created new test request with ID: {request_id}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        return False
+    # Goes through the app's engine (DATABASE_URL), so it works on any backend
+    with app.app_context():
+        try:
+            # Add a new test request
+            blood_request = BloodRequest(
+                receiver_id=3,  # jack's receiver ID
+                blood_group_needed='A+',  # Compatible with akash's O+ blood
+                quantity_needed='2 units (450ml)',
+                urgency='High',
+                hospital_name='Test Hospital',
+                hospital_location='Test Location',
+                contact_person='Test Person',
+                contact_number='1234567890',
+                needed_by_date=datetime.now() + timedelta(days=3),
+                additional_notes='Test request to verify filtering works',
+                request_date=datetime.now(),
+                status='Active'
+            )
+            db.session.add(blood_request)
+            db.session.commit()
+            
+            print(f"✅ Created new test request with ID: {blood_request.id}")
+            return True
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error: {str(e)}")
+            return False
 
 if __name__ == "__main__":
-    add_test_request()
\ No newline at end of file
+    add_test_request()
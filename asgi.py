@@ -0,0 +1,96 @@
+"""
+ASGI entry point: async geocoding in front of the Flask app
+
+    uvicorn asgi:app          (pip install uvicorn; aiohttp for async Nominatim calls)
+    hypercorn asgi:app
+
+/api/reverse-geocode runs entirely on the event loop. /search-donors
+geocodes the typed location on the event loop, into the geocode cache the
+Flask view reads, then the view filters and renders from a worker thread
+in milliseconds. Waiting for Nominatim and its rate limit holds no
+thread, so one process serves many concurrent location searches. Every
+other route is the Flask app as served by wsgi.py, on ASGI_THREADS worker
+threads (default WEB_THREADS). /events long-polls run on their own
+ASGI_STREAM_THREADS threads, so open dashboards never hold up other
+requests. bench_async.py compares the two servers.
+"""
+
+import json
+
+from app import warm_up, env_int, gazetteer, geocode_cache, geocode_queries, geolocator, nominatim_limiter
+from asgi_bridge import WSGIBridge, form_fields, read_body, send_json
+
+# Long-lived responses, served from their own thread pool
+STREAM_PATHS = ('/events',)
+from async_geocoding import AsyncGeocoder, AsyncRateLimiter, nominatim_backend
+
+
+class BloodFinderASGI:
+    """
+    Async search/geocoding routes; the rest is passed to the WSGI app
+    """
+
+    def __init__(self, wsgi_app, geocoder, threads=4, stream_threads=16):
+        self.geocoder = geocoder
+        self.wsgi = WSGIBridge(wsgi_app, threads=threads)
+        self.streams = WSGIBridge(wsgi_app, threads=stream_threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] == 'POST' and scope['path'] == '/api/reverse-geocode':
+            return await self.reverse_geocode(receive, send)
+        if scope['method'] == 'POST' and scope['path'] == '/search-donors':
+            return await self.search_donors(scope, receive, send)
+        if scope['path'] in STREAM_PATHS:
+            return await self.streams(scope, receive, send)
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.geocoder.backend.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.geocoder.backend.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def reverse_geocode(self, receive, send):
+        # Same answers as app.api_reverse_geocode
+        try:
+            data = json.loads(await read_body(receive))
+        except ValueError:
+            return await send_json(send, {'success': False, 'error': 'Invalid JSON'}, status=400)
+        lat = data.get('latitude')
+        lon = data.get('longitude')
+        if not lat or not lon:
+            return await send_json(send, {'success': False, 'error': 'Coordinates required'})
+        await send_json(send, await self.geocoder.reverse(lat, lon))
+
+    async def search_donors(self, scope, receive, send):
+        body = await read_body(receive)
+        form = form_fields(scope, body)
+        location = form.get('location', '').strip()
+        # GPS searches need no geocoding; the view reads typed locations from the cache
+        if location and not (form.get('user_lat') and form.get('user_lon')):
+            await self.geocoder.geocode_address(location)
+        await self.wsgi(scope, receive, send, body=body)
+
+
+def create_asgi_app(geocoder=None, threads=None, stream_threads=None):
+    flask_app = warm_up()
+    if geocoder is None:
+        geocoder = AsyncGeocoder(geocode_cache, AsyncRateLimiter(nominatim_limiter), nominatim_backend(geolocator),
+                                 queries=geocode_queries, gazetteer=gazetteer)
+    if threads is None:
+        threads = env_int('ASGI_THREADS', env_int('WEB_THREADS', 4))
+    if stream_threads is None:
+        stream_threads = env_int('ASGI_STREAM_THREADS', 16)
+    return BloodFinderASGI(flask_app, geocoder, threads=threads, stream_threads=stream_threads)
+
+
+app = application = create_asgi_app()
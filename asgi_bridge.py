@@ -0,0 +1,173 @@
+"""
+Minimal ASGI plumbing for asgi.py: reading request bodies, JSON answers,
+and running the Flask (WSGI) app for every route without an async variant
+
+WSGI calls run on a bounded thread pool and their responses are streamed
+chunk by chunk, so streaming routes (/events, /admin/export) keep working.
+When the client disconnects, the response stops at its next chunk and the
+thread is released. Only http and lifespan scopes are handled.
+"""
+
+import asyncio
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+
+async def wait_disconnect(receive):
+    """Return once the client has gone (reads past the request body)"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    return bytes(body)
+
+
+def header(scope, name):
+    """First value of a request header (name in lower case), or None"""
+    name = name.encode('latin-1')
+    for key, value in scope['headers']:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+def form_fields(scope, body):
+    """{name: first value} of an urlencoded form body"""
+    if (header(scope, 'content-type') or '').split(';')[0].strip() != 'application/x-www-form-urlencoded':
+        return {}
+    return {key: values[0] for key, values in parse_qs(body.decode('utf-8', 'replace')).items()}
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for key, value in scope['headers']:
+        name = key.decode('latin-1').upper().replace('-', '_')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value.decode('latin-1')
+            continue
+        name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[name] = f'{environ[name]},{value}' if name in environ else value
+    return environ
+
+
+class WSGIBridge:
+    """
+    Serve a WSGI app from ASGI; `threads` bounds the WSGI calls running at once
+    """
+
+    def __init__(self, wsgi_app, threads=4):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send, body=None):
+        if body is None:
+            body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        # The whole WSGI call runs in one worker thread, as under a threaded
+        # WSGI server; chunks come back through a small queue, so a slow
+        # client holds the thread back instead of buffering the response
+        chunks = asyncio.Queue(maxsize=8)
+        stopped = threading.Event()
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(chunks.put(item), loop)
+            while not stopped.is_set():
+                try:
+                    return future.result(timeout=1)
+                except TimeoutError:
+                    continue
+            future.cancel()
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+                response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                       for name, value in headers]
+                return lambda data: None  # write() is not supported
+
+            try:
+                result = self.wsgi_app(wsgi_environ(scope, body), start_response)
+                try:
+                    started = False
+                    for chunk in result:
+                        if stopped.is_set():
+                            return
+                        # start_response may be deferred until the first chunk
+                        if not started:
+                            put(('start', response))
+                            started = True
+                        if chunk:
+                            put(('body', chunk))
+                    if not started:
+                        put(('start', response))
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+                put(('end', None))
+            except Exception as e:
+                put(('error', e))
+
+        loop.run_in_executor(self.executor, run)
+        disconnected = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            while True:
+                chunk = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    return
+                kind, value = chunk.result()
+                if kind == 'start':
+                    await send({'type': 'http.response.start', 'status': value['status'],
+                                'headers': value['headers']})
+                elif kind == 'body':
+                    await send({'type': 'http.response.body', 'body': value, 'more_body': True})
+                elif kind == 'error':
+                    raise value
+                else:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+        finally:
+            # Client gone or response done: the worker stops at its next chunk
+            stopped.set()
+            disconnected.cancel()
@@ -0,0 +1,166 @@
+"""
+Geocoding on an asyncio event loop (used by asgi.py)
+
+The sync path (app.geocode_address_free) holds a server thread while it
+sleeps in the Nominatim rate limiter and while the HTTP request is in
+flight. Here both are awaited instead: the slot is claimed from the same
+shared limiter and waited for with asyncio.sleep, and Nominatim is called
+through geopy's aiohttp adapter when aiohttp is installed (otherwise the
+sync client runs in a worker thread; the rate limit keeps at most one or
+two such calls in flight). Concurrent lookups of the same query share one
+request, and results go into the same GeocodeCache as the sync path.
+Addresses the offline gazetteer (gazetteer.py) places entirely are
+answered first, and its partial matches are the fallback, as there.
+"""
+
+import asyncio
+
+try:
+    import aiohttp
+    from geopy.adapters import AioHTTPAdapter
+except ImportError:  # optional: pip install aiohttp
+    aiohttp = None
+
+from geopy.geocoders import Nominatim
+
+
+class AsyncRateLimiter:
+    """
+    Awaitable front for a RateLimiter/SharedRateLimiter (geocode_queue.py),
+    so async and sync callers share the same slots
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    async def wait(self, count=1):
+        # Claiming a shared slot is a short SQLite transaction
+        delay = await asyncio.to_thread(self.limiter.reserve, count)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AioHTTPNominatim:
+    """Nominatim over aiohttp; start() and close() bracket its HTTP session"""
+
+    def __init__(self, user_agent, timeout=10):
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=timeout, adapter_factory=AioHTTPAdapter)
+
+    async def start(self):
+        await self.geolocator.__aenter__()
+
+    async def close(self):
+        await self.geolocator.__aexit__(None, None, None)
+
+    async def geocode(self, query):
+        return await self.geolocator.geocode(query)
+
+    async def reverse(self, lat, lon):
+        return await self.geolocator.reverse(f"{lat}, {lon}")
+
+
+class ThreadedNominatim:
+    """A sync geopy geolocator called from a worker thread"""
+
+    def __init__(self, geolocator, timeout=10):
+        self.geolocator = geolocator
+        self.timeout = timeout
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def geocode(self, query):
+        return await asyncio.to_thread(self.geolocator.geocode, query, timeout=self.timeout)
+
+    async def reverse(self, lat, lon):
+        return await asyncio.to_thread(self.geolocator.reverse, f"{lat}, {lon}", timeout=self.timeout)
+
+
+def nominatim_backend(geolocator):
+    """An aiohttp client like the sync `geolocator` when available, else `geolocator` in a thread"""
+    if aiohttp is not None:
+        return AioHTTPNominatim(geolocator.headers['User-Agent'])
+    return ThreadedNominatim(geolocator)
+
+
+class AsyncGeocoder:
+    """
+    Cache-first geocoding without blocking the event loop; results have the
+    same shape as geocode_address_free / reverse_geocode_free
+    """
+
+    def __init__(self, cache, limiter, backend, queries=lambda address: [address], gazetteer=None):
+        self.cache = cache
+        self.limiter = limiter
+        self.backend = backend
+        # In-memory lookups are microseconds, fine to run on the event loop
+        self.gazetteer = gazetteer
+        # Query strings tried in turn for an address (app.geocode_queries)
+        self.queries = queries
+        self._inflight = {}
+        self.lookups = 0
+
+    async def geocode_query(self, query):
+        # Cache reads are WAL reads and never wait for writers
+        cached = self.cache.get(query)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(query)
+        if pending is None:
+            pending = asyncio.ensure_future(self._lookup(query))
+            self._inflight[query] = pending
+        # A cancelled caller (client gone) does not cancel the lookup others wait on
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, query):
+        try:
+            await self.limiter.wait()
+            self.lookups += 1
+            location = await self.backend.geocode(query)
+            if location:
+                result = {
+                    'latitude': location.latitude,
+                    'longitude': location.longitude,
+                    'full_address': location.address,
+                    'success': True
+                }
+            else:
+                result = {'success': False, 'error': f'Address "{query}" not found'}
+            await asyncio.to_thread(self.cache.set, query, result)
+            return result
+        finally:
+            self._inflight.pop(query, None)
+
+    async def geocode_address(self, address):
+        try:
+            if self.gazetteer is not None:
+                result = self.gazetteer.geocode(address)
+                if result:
+                    return result
+            for query in self.queries(address):
+                result = await self.geocode_query(query)
+                if result['success']:
+                    return result
+            error = f'Address "{address}" not found'
+        except Exception as e:
+            error = str(e)
+        result = self.gazetteer.geocode(address, partial=True) if self.gazetteer is not None else None
+        return result or {'success': False, 'error': error}
+
+    async def reverse(self, lat, lon):
+        try:
+            if self.gazetteer is not None:
+                result = self.gazetteer.reverse(lat, lon)
+                if result:
+                    return result
+            await self.limiter.wait()
+            self.lookups += 1
+            location = await self.backend.reverse(lat, lon)
+            if location:
+                return {'address': location.address, 'success': True}
+            return {'success': False, 'error': 'Location not found'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
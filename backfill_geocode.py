@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Offline geocoding backfill for donors and receivers
+
+Usage: python backfill_geocode.py [--stale-days N] [--batch-size N] [--limit N] [--restart]
+
+Selects every Donor and Receiver that is not geocoded, or whose coordinates
+are older than --stale-days, and groups them by normalized address so each
+distinct address is looked up once (through the geocode cache and the
+shared Nominatim rate limit, see geocode_queue.SharedRateLimiter).
+Coordinates are written back --batch-size addresses at a time, one
+transaction and one UPDATE per address and table per batch; updated donors
+are re-matched to the active blood requests in the same transaction.
+
+Addresses are processed in sorted order and the last committed one is
+checkpointed to instance/geocode_backfill.json, so the job can be killed
+and resumed; --restart starts over. Running web servers reload their donor
+snapshot on their next search after a batch commits.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import app, db, Donor, Receiver, geocode_address_free, match_donor
+from geocode_cache import normalize_address
+from spatial_index import grid_cell
+
+MODELS = {'donor': Donor, 'receiver': Receiver}
+# Keeps each UPDATE under the database's bound parameter limit
+IDS_PER_UPDATE = 1000
+
+
+class BackfillCheckpoint:
+    """Cutoff and last committed address of an interrupted backfill"""
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.state = None
+        if os.path.exists(path) and not restart:
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def save(self, state):
+        self.state = state
+        # Write then rename, so an interruption never leaves a torn file
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def needs_geocoding(model, cutoff):
+    return db.or_(model.geocoded == False, model.geocoded.is_(None),
+                  model.latitude.is_(None), model.longitude.is_(None),
+                  model.last_geocoded.is_(None), model.last_geocoded < cutoff)
+
+
+def pending_addresses(cutoff, after=None):
+    """
+    {normalized address: (location as written, {location variants}, {'donor': [ids], 'receiver': [ids]})}
+    for rows needing coordinates, keys after `after` only, in sorted order
+    """
+    addresses = {}
+    for kind, model in MODELS.items():
+        rows = db.session.query(model.id, model.location).filter(needs_geocoding(model, cutoff)).yield_per(5000)
+        for row_id, location in rows:
+            key = normalize_address(location)
+            if not key or (after is not None and key <= after):
+                continue
+            entry = addresses.setdefault(key, (location.strip(), set(), {'donor': [], 'receiver': []}))
+            entry[1].add(location)
+            entry[2][kind].append(row_id)
+    return dict(sorted(addresses.items()))
+
+
+def write_batch(results):
+    """
+    Store geocoded coordinates for a batch of addresses in one transaction
+    and re-match the donors to the active requests
+    results: [(result, location variants, {'donor': [ids], 'receiver': [ids]})]
+    Returns the number of rows updated
+    """
+    now = datetime.now()
+    updated = 0
+    donor_ids = []
+    for result, variants, ids in results:
+        values = {'latitude': result['latitude'], 'longitude': result['longitude'],
+                  'geocoded': True, 'last_geocoded': now}
+        for kind, row_ids in ids.items():
+            if not row_ids:
+                continue
+            model = MODELS[kind]
+            kind_values = dict(values)
+            # Same fields set_coordinates() keeps in sync for a single donor
+            if kind == 'donor':
+                kind_values['grid_cell'] = grid_cell(result['latitude'], result['longitude'])
+                donor_ids += row_ids
+            # Rows whose location was edited since they were read keep their new geocoding job
+            for start in range(0, len(row_ids), IDS_PER_UPDATE):
+                updated += db.session.execute(
+                    db.update(model)
+                    .where(model.id.in_(row_ids[start:start + IDS_PER_UPDATE]), model.location.in_(variants))
+                    .values(**kind_values),
+                    execution_options={'synchronize_session': False}
+                ).rowcount
+    # As rematch_donor() after set_coordinates(); donors skipped above are
+    # re-matched on their current coordinates, which changes nothing
+    conn = db.session.connection()
+    for donor_id in donor_ids:
+        match_donor(conn, donor_id, now)
+    db.session.commit()
+    return updated
+
+
+def backfill(stale_days=180, batch_size=50, limit=None, restart=False, report=print):
+    """
+    Geocode every row that needs it, one lookup per distinct address
+    Returns a summary dict
+    """
+    with app.app_context():
+        checkpoint = BackfillCheckpoint(os.path.join(app.instance_path, 'geocode_backfill.json'), restart)
+        state = checkpoint.state or {
+            # Fixed for the whole run, so a resumed run sees the same stale rows
+            'cutoff': (datetime.now() - timedelta(days=stale_days)).isoformat(),
+            'last_address': None, 'addresses': 0, 'geocoded': 0, 'failed': 0, 'rows': 0,
+        }
+        if checkpoint.state:
+            report(f"↪️  Resuming after '{state['last_address']}' "
+                   f"({state['addresses']} addresses, {state['rows']} rows so far)")
+
+        addresses = pending_addresses(datetime.fromisoformat(state['cutoff']), state['last_address'])
+        # End the read transaction: with SQLite WAL, write_batch could not
+        # take the write lock after another process commits meanwhile
+        db.session.commit()
+        total_rows = sum(len(ids['donor']) + len(ids['receiver']) for _, _, ids in addresses.values())
+        report(f"🌍 {len(addresses)} distinct addresses for {total_rows} donors/receivers")
+
+        started = time.perf_counter()
+        processed = 0
+        batch = []
+        keys = list(addresses)
+        if limit is not None:
+            keys = keys[:limit]
+        for number, key in enumerate(keys, start=1):
+            location, variants, ids = addresses[key]
+            # Nothing is held open across the (rate limited) network call
+            result = geocode_address_free(location)
+            if result['success']:
+                batch.append((result, variants, ids))
+                state['geocoded'] += 1
+            else:
+                state['failed'] += 1
+                report(f"❌ '{location}': {result.get('error', 'Unknown error')}")
+            state['addresses'] += 1
+            processed += 1
+
+            if number % batch_size == 0 or number == len(keys):
+                state['rows'] += write_batch(batch)
+                state['last_address'] = key
+                checkpoint.save(state)
+                batch = []
+                elapsed = time.perf_counter() - started
+                report(f"📍 {state['addresses']} addresses ({state['geocoded']} found, {state['failed']} not found), "
+                       f"{state['rows']} rows updated, {processed / elapsed:.2f} addresses/s")
+
+        finished = len(keys) == len(addresses)
+        if finished:
+            checkpoint.clear()
+        return dict(state, finished=finished, seconds=time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Geocode all donors/receivers missing or with stale coordinates')
+    parser.add_argument('--stale-days', type=int, default=180,
+                        help='re-geocode coordinates older than this (default: 180)')
+    parser.add_argument('--batch-size', type=int, default=50, help='addresses per database write (default: 50)')
+    parser.add_argument('--limit', type=int, default=None, help='geocode at most N addresses in this run')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    summary = backfill(args.stale_days, args.batch_size, args.limit, args.restart)
+    print("=" * 60)
+    print(f"✅ {summary['geocoded']} addresses geocoded, {summary['failed']} not found; "
+          f"{summary['rows']} donors/receivers updated in {summary['seconds']:.0f}s")
+    if not summary['finished']:
+        print("   Stopped early; run again to resume")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent location searches on the sync server (wsgi.py)
+versus the async one (asgi.py)
+
+Usage: python bench_async.py [--clients N] [--threads T] [--new-rate R]
+                             [--latency S] [--interval S] [--donors N]
+
+N clients post /search-donors at the same moment (a burst of receivers
+after an appeal). A share R of them type a location nobody searched
+before: a geocode cache miss, one Nominatim call, at most one per
+--interval seconds. The others search a city that is already cached.
+Nominatim is replaced by a stand-in that answers after --latency seconds,
+and the run uses a throwaway database, geocode cache and rate limiter.
+
+The sync server has T threads, so cached searches queue behind new ones
+sleeping in the rate limiter. Under asgi.py new searches wait on the event
+loop and only the filtering/rendering uses the T threads. Rendering is
+CPU work under the GIL, so with many donors per result page both servers
+end up limited by it; raise --donors to see that ceiling.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+CITY = (12.97, 77.59)
+CACHED_LOCATION = 'Bench City'
+
+
+class FakeNominatim:
+    """Answers every query after `latency` seconds, near CITY"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def _location(self, name):
+        return SimpleNamespace(latitude=CITY[0] + 0.01, longitude=CITY[1] + 0.01, address=name)
+
+    def geocode(self, query, timeout=None):
+        time.sleep(self.latency)
+        return self._location(query)
+
+    def reverse(self, query, timeout=None):
+        time.sleep(self.latency)
+        return self._location(query)
+
+
+class FakeAsyncNominatim(FakeNominatim):
+    """The same stand-in as an async HTTP client"""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def geocode(self, query):
+        await asyncio.sleep(self.latency)
+        return self._location(query)
+
+    async def reverse(self, lat, lon):
+        await asyncio.sleep(self.latency)
+        return self._location(f'{lat}, {lon}')
+
+
+def percentile(values, share):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def search_forms(mode, clients, new_rate):
+    forms = []
+    for n in range(clients):
+        is_new = n < round(clients * new_rate)
+        # New locations differ per mode, so the second run does not hit the first run's cache
+        location = f'{mode} locality {n}' if is_new else CACHED_LOCATION
+        forms.append((is_new, {'location': location, 'blood_group': '', 'radius': '10'}))
+    random.Random(1).shuffle(forms)
+    return forms
+
+
+def run_sync(flask_app, forms, threads):
+    """Each client's latency on a server with `threads` threads"""
+    def post(form):
+        response = flask_app.test_client().post('/search-donors', data=form)
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(post, form) for _, form in forms]
+        return [future.result() - started for future in futures]
+
+
+async def run_async(asgi_app, forms):
+    """Each client's latency on the ASGI app, all requests in flight at once"""
+    async def post(form):
+        body = urlencode(form).encode()
+        scope = {'type': 'http', 'method': 'POST', 'path': '/search-donors', 'query_string': b'',
+                 'headers': [(b'content-type', b'application/x-www-form-urlencoded'),
+                             (b'content-length', str(len(body)).encode())]}
+        messages = [{'type': 'http.request', 'body': body}]
+        status = {}
+        done = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            elif not message.get('more_body'):
+                done.set()
+
+        await asgi_app(scope, receive, send)
+        assert status['code'] == 200, status
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    finished = await asyncio.gather(*(post(form) for _, form in forms))
+    return [done - started for done in finished]
+
+
+def report(name, forms, latencies, threads):
+    wall = max(latencies)
+    cached = [latency for (is_new, _), latency in zip(forms, latencies) if not is_new]
+    new = [latency for (is_new, _), latency in zip(forms, latencies) if is_new]
+    within_second = sum(latency <= 1.0 for latency in latencies)
+    print(f"{name:<22} {threads:>7} {len(latencies) / wall:>8.1f} {within_second:>9} "
+          f"{percentile(cached, 0.5):>7.2f}s {percentile(cached, 0.95):>7.2f}s "
+          f"{percentile(new, 0.5):>7.2f}s {percentile(new, 0.95):>7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent location searches: sync vs async server')
+    parser.add_argument('--clients', type=int, default=200, help='concurrent searches (default: 200)')
+    parser.add_argument('--threads', type=int, default=4, help='server threads, as WEB_THREADS (default: 4)')
+    parser.add_argument('--new-rate', type=float, default=0.05, help='share of uncached locations (default: 0.05)')
+    parser.add_argument('--latency', type=float, default=0.3, help='Nominatim answer time in seconds (default: 0.3)')
+    parser.add_argument('--interval', type=float, default=1.1, help='seconds between Nominatim calls (default: 1.1)')
+    parser.add_argument('--donors', type=int, default=40, help='donors around the city (default: 40)')
+    args = parser.parse_args()
+
+    # A throwaway database, set before app.py reads DATABASE_URL
+    workdir = tempfile.mkdtemp(prefix='bench_async_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    import app as app_module
+    from app import app, db, Donor, geocode_queries
+    from async_geocoding import AsyncGeocoder, AsyncRateLimiter
+    from geocode_cache import GeocodeCache
+    from geocode_queue import SharedRateLimiter
+    from spatial_index import grid_cell
+
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        rows = []
+        for n in range(args.donors):
+            lat, lon = CITY[0] + rng.uniform(-0.1, 0.1), CITY[1] + rng.uniform(-0.1, 0.1)
+            rows.append({'name': f'Bench donor {n}', 'email': f'bench{n}@load.test', 'password': 'x', 'age': 30,
+                         'gender': 'F', 'blood_group': rng.choice(['A+', 'B+', 'O+', 'AB+']), 'location': 'Bench City',
+                         'contact': '1', 'latitude': lat, 'longitude': lon, 'geocoded': True,
+                         'grid_cell': grid_cell(lat, lon)})
+        db.session.execute(db.insert(Donor), rows)
+        db.session.commit()
+
+    cache = GeocodeCache(os.path.join(workdir, 'geocode_cache.db'))
+    cache.set(CACHED_LOCATION, {'latitude': CITY[0], 'longitude': CITY[1], 'full_address': CACHED_LOCATION,
+                                'success': True})
+    app_module.geocode_cache = cache
+    app_module.geolocator = FakeNominatim(args.latency)
+    # Imported once the tables exist: asgi.py warms the donor snapshot
+    from asgi import BloodFinderASGI
+    flask_app = app_module.warm_up()
+
+    print(f"🔎 {args.clients} concurrent searches, {args.new_rate:.0%} new locations, "
+          f"Nominatim {args.latency}s per call, one call per {args.interval}s, {args.donors} donors")
+    print(f"{'Server':<22} {'threads':>7} {'req/s':>8} {'within 1s':>9} "
+          f"{'cached p50':>8} {'p95':>8} {'new p50':>8} {'p95':>8}")
+
+    # Search output is printed per donor; keep it out of the report
+    forms = search_forms('sync', args.clients, args.new_rate)
+    app_module.nominatim_limiter = SharedRateLimiter(os.path.join(workdir, 'limits.db'), args.interval, name='sync')
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = run_sync(flask_app, forms, args.threads)
+    report('sync (wsgi.py)', forms, latencies, args.threads)
+
+    forms = search_forms('async', args.clients, args.new_rate)
+    app_module.nominatim_limiter = SharedRateLimiter(os.path.join(workdir, 'limits.db'), args.interval, name='async')
+    geocoder = AsyncGeocoder(cache, AsyncRateLimiter(app_module.nominatim_limiter), FakeAsyncNominatim(args.latency),
+                             queries=geocode_queries)
+    asgi_app = BloodFinderASGI(flask_app, geocoder, threads=args.threads)
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = asyncio.run(run_async(asgi_app, forms))
+    report('async (asgi.py)', forms, latencies, args.threads)
+    print(f"   Nominatim calls: {geocoder.lookups} (async); output in {workdir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
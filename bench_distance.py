@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-donor geodesic loop vs vectorized haversine engine
+
+Usage: python bench_distance.py [--loop-limit N]
+
+The per-donor loop is what search_donors used to do (one
+calculate_distance_free call per donor). It is slow enough that at 1M
+donors it is timed on the first --loop-limit donors and extrapolated.
+"""
+
+import random
+import sys
+import time
+
+from app import calculate_distance_free
+from distance_engine import distances_within, np
+
+SIZES = [1_000, 100_000, 1_000_000]
+RADIUS_KM = 10
+# Recipient in Hubli, donors spread over Karnataka
+CENTER = (15.3647, 75.1240)
+
+
+def make_donors(n, seed=42):
+    rng = random.Random(seed)
+    lats = [rng.uniform(11.5, 18.5) for _ in range(n)]
+    lons = [rng.uniform(74.0, 78.5) for _ in range(n)]
+    return lats, lons
+
+
+def run_loop(lats, lons):
+    matches = []
+    for lat, lon in zip(lats, lons):
+        distance = calculate_distance_free(CENTER[0], CENTER[1], lat, lon)
+        if distance is not None and distance <= RADIUS_KM:
+            matches.append(distance)
+    matches.sort()
+    return matches
+
+
+def main():
+    loop_limit = 100_000
+    if '--loop-limit' in sys.argv:
+        loop_limit = int(sys.argv[sys.argv.index('--loop-limit') + 1])
+
+    print("=" * 72)
+    print(f"Distance benchmark: radius={RADIUS_KM}km, numpy={'yes' if np is not None else 'NO (pure Python fallback)'}")
+    print("=" * 72)
+    print(f"{'donors':>10} {'loop (s)':>12} {'engine (s)':>12} {'speedup':>10} {'matches':>10}")
+
+    for n in SIZES:
+        lats, lons = make_donors(n)
+
+        sample = min(n, loop_limit)
+        start = time.perf_counter()
+        loop_matches = run_loop(lats[:sample], lons[:sample])
+        loop_time = (time.perf_counter() - start) * n / sample
+        extrapolated = '*' if sample < n else ' '
+
+        if np is not None:
+            lats, lons = np.asarray(lats), np.asarray(lons)
+        start = time.perf_counter()
+        indices, distances = distances_within(CENTER[0], CENTER[1], lats, lons, RADIUS_KM)
+        engine_time = time.perf_counter() - start
+
+        if sample == n and len(loop_matches) != len(distances):
+            print(f"  ⚠️ mismatch at {n}: loop={len(loop_matches)} engine={len(distances)}")
+
+        print(f"{n:>10} {loop_time:>11.3f}{extrapolated} {engine_time:>12.4f} "
+              f"{loop_time / engine_time:>9.0f}x {len(distances):>10}")
+
+    print("\n* extrapolated from the first", loop_limit, "donors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login cost of each password hashing policy
+
+Usage: python bench_passwords.py [--seconds S] [method ...]
+
+Each method is a werkzeug hash method string as used by
+PASSWORD_HASH_METHOD (see passwords.py). A login is one password check,
+timed on a single thread, so logins/sec is per core; multiply by the
+number of worker processes to size a deployment.
+"""
+
+import os
+import sys
+import time
+
+from passwords import PasswordPolicy
+
+METHODS = [
+    'scrypt',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+PASSWORD = 'correct horse battery staple'
+
+
+def logins_per_second(policy, seconds):
+    stored = policy.hash(PASSWORD)
+    checks = 0
+    start = time.perf_counter()
+    while True:
+        if not policy.verify(stored, PASSWORD):
+            raise AssertionError(f"{policy.method} failed to verify its own hash")
+        checks += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return checks / elapsed
+
+
+def main():
+    args = sys.argv[1:]
+    seconds = 2.0
+    if '--seconds' in args:
+        index = args.index('--seconds')
+        seconds = float(args[index + 1])
+        del args[index:index + 2]
+    methods = args or METHODS
+    cores = os.cpu_count() or 1
+
+    print("=" * 72)
+    print(f"Password hashing benchmark: {seconds:g}s per method, {cores} cores")
+    print("=" * 72)
+    print(f"{'method':<28} {'ms/login':>10} {'logins/s/core':>15} {'all cores':>12}")
+
+    for method in methods:
+        policy = PasswordPolicy(method)
+        rate = logins_per_second(policy, seconds)
+        print(f"{policy.method:<28} {1000 / rate:>10.1f} {rate:>15.1f} {rate * cores:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
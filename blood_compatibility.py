@@ -0,0 +1,80 @@
+"""
+Precomputed blood group compatibility (red cell donation)
+
+Blood groups have small integer codes; compatibility in each direction is
+precomputed once as a bitmask per code plus a list of group strings, which
+can be passed straight to SQL IN filters or to the in-memory donor snapshot
+"""
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+BLOOD_GROUP_CODES = {group: code for code, group in enumerate(BLOOD_GROUPS)}
+UNKNOWN_BLOOD_GROUP = -1
+
+# Donor blood groups that can give to each recipient blood group
+_RECEIVES_FROM = {
+    'A+': ['A+', 'A-', 'O+', 'O-'],
+    'A-': ['A-', 'O-'],
+    'B+': ['B+', 'B-', 'O+', 'O-'],
+    'B-': ['B-', 'O-'],
+    'AB+': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'],
+    'AB-': ['A-', 'B-', 'AB-', 'O-'],
+    'O+': ['O+', 'O-'],
+    'O-': ['O-'],
+}
+
+
+def _mask(groups):
+    mask = 0
+    for group in groups:
+        mask |= 1 << BLOOD_GROUP_CODES[group]
+    return mask
+
+
+def _groups(mask, first):
+    # Group list for a bitmask, with the exact match first
+    groups = [group for code, group in enumerate(BLOOD_GROUPS) if mask & (1 << code)]
+    return sorted(groups, key=lambda group: group != first)
+
+
+# recipient code -> bitmask of donor codes that can give to it
+DONOR_MASKS = [_mask(_RECEIVES_FROM[group]) for group in BLOOD_GROUPS]
+# donor code -> bitmask of recipient codes it can give to
+RECIPIENT_MASKS = [
+    sum(1 << recipient for recipient in range(len(BLOOD_GROUPS)) if DONOR_MASKS[recipient] & (1 << donor))
+    for donor in range(len(BLOOD_GROUPS))
+]
+
+# Same tables as group lists, ready for SQL IN filters
+DONORS_FOR = {group: _groups(DONOR_MASKS[code], group) for code, group in enumerate(BLOOD_GROUPS)}
+RECIPIENTS_FOR = {group: _groups(RECIPIENT_MASKS[code], group) for code, group in enumerate(BLOOD_GROUPS)}
+
+
+def blood_group_code(group):
+    return BLOOD_GROUP_CODES.get(group, UNKNOWN_BLOOD_GROUP)
+
+
+def can_donate(donor_group, recipient_group):
+    """
+    True if a donor with donor_group can give to recipient_group
+    """
+    donor = BLOOD_GROUP_CODES.get(donor_group)
+    recipient = BLOOD_GROUP_CODES.get(recipient_group)
+    if donor is None or recipient is None:
+        return False
+    return bool(RECIPIENT_MASKS[donor] & (1 << recipient))
+
+
+def donors_for(recipient_group):
+    """
+    Blood groups that can donate to recipient_group (exact match first)
+    Unknown groups only match themselves
+    """
+    return DONORS_FOR.get(recipient_group, [recipient_group])
+
+
+def recipients_for(donor_group):
+    """
+    Blood groups that donor_group can donate to (exact match first)
+    Unknown groups only match themselves
+    """
+    return RECIPIENTS_FOR.get(donor_group, [donor_group])
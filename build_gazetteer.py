@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Build the offline gazetteer table (data/gazetteer_in.tsv.gz, see gazetteer.py)
+
+Usage: python build_gazetteer.py [--table rows.tsv ...] [--postal IN.txt]
+                                 [--cities cities15000.txt --admin1 admin1CodesASCII.txt]
+                                 [--output PATH] [--fresh] [--dump]
+
+Rows are merged in this order, the first of a name within a district or
+state winning (gazetteer.py prefers earlier rows on ties):
+
+1. the current table at --output, unless --fresh
+2. --table files: hand-maintained rows in the table's own TSV format
+   (name, aliases separated by |, district, state, pincode, latitude,
+   longitude, kind), e.g. a --dump edited to add a locality
+3. --cities: a GeoNames cities dump (https://download.geonames.org/export/dump/,
+   cities15000.zip or allCountries.zip), Indian places by population, with
+   --admin1 naming their states
+4. --postal: the GeoNames postal code dump for India
+   (https://download.geonames.org/export/zip/IN.zip), one row per post office
+
+--dump prints the resulting table as TSV instead of writing it.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from gazetteer import COLUMNS, normalize_name, read_table, write_table
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer_in.tsv.gz')
+
+# GeoNames place names that are ASCII, so aliases stay searchable as typed
+MAX_ALIASES = 8
+
+
+def geonames_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        yield from csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+
+
+def city_rows(path, admin1_path):
+    """Indian GeoNames populated places, most populous first"""
+    states = {}
+    if admin1_path:
+        for code, name, *_ in geonames_rows(admin1_path):
+            states[code] = name
+    places = []
+    for fields in geonames_rows(path):
+        if fields[8] != 'IN' or fields[6] != 'P':
+            continue
+        aliases = [fields[2]] + [alias for alias in fields[3].split(',') if alias.isascii()]
+        aliases = [alias for alias in dict.fromkeys(aliases) if alias and alias != fields[1]][:MAX_ALIASES]
+        population = int(fields[14] or 0)
+        places.append((population, {
+            'name': fields[1], 'aliases': '|'.join(aliases), 'district': '',
+            'state': states.get(f'IN.{fields[10]}', ''), 'pincode': '',
+            'latitude': fields[4], 'longitude': fields[5],
+            'kind': 'city' if population >= 100000 else 'town',
+        }))
+    places.sort(key=lambda place: -place[0])
+    return [row for _, row in places]
+
+
+def postal_rows(path):
+    """One row per post office of the GeoNames postal dump"""
+    for fields in geonames_rows(path):
+        if len(fields) < 11 or fields[0] != 'IN' or not fields[9] or not fields[10]:
+            continue
+        yield {
+            'name': fields[2], 'aliases': '', 'district': fields[5], 'state': fields[3],
+            'pincode': fields[1], 'latitude': fields[9], 'longitude': fields[10], 'kind': 'locality',
+        }
+
+
+def merge(sources):
+    """
+    Rows whose name is not yet a name or alias of a kept row in the same
+    district (or state, for rows without a district, like GeoNames cities)
+    """
+    rows, seen = [], set()
+    for source in sources:
+        for row in source:
+            name = normalize_name(row['name'])
+            district, state = normalize_name(row['district']), normalize_name(row['state'])
+            if not name or (('district', district, name) if district else ('state', state, name)) in seen:
+                continue
+            for key in [name] + [normalize_name(alias) for alias in row['aliases'].split('|') if alias]:
+                seen.add(('district', district, key))
+                seen.add(('state', state, key))
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the offline gazetteer table')
+    parser.add_argument('--table', action='append', default=[], help='rows in gazetteer TSV format (repeatable)')
+    parser.add_argument('--cities', help='GeoNames cities dump (cities15000.txt)')
+    parser.add_argument('--admin1', help='GeoNames admin1CodesASCII.txt, for state names of --cities')
+    parser.add_argument('--postal', help='GeoNames postal code dump for India (IN.txt)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='table to update (default: data/gazetteer_in.tsv.gz)')
+    parser.add_argument('--fresh', action='store_true', help='ignore the current table at --output')
+    parser.add_argument('--dump', action='store_true', help='print the table as TSV instead of writing it')
+    args = parser.parse_args()
+
+    sources = []
+    if not args.fresh and os.path.exists(args.output):
+        sources.append(read_table(args.output))
+    sources += [read_table(path) for path in args.table]
+    if args.cities:
+        sources.append(city_rows(args.cities, args.admin1))
+    if args.postal:
+        sources.append(postal_rows(args.postal))
+    rows = merge(sources)
+
+    if args.dump:
+        writer = csv.DictWriter(sys.stdout, COLUMNS, delimiter='\t', lineterminator='\n', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        return 0
+    if not rows:
+        print("❌ No rows to write")
+        return 1
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_table(args.output, rows)
+    print(f"✅ {len(rows)} places written to {args.output} ({os.path.getsize(args.output) // 1024} KiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,5 +1,16 @@
+from sqlalchemy.orm import joinedload
+
 from app import app, db, Donor, Receiver, Admin, BloodRequest, DonationResponse, DonationHistory
 
+# Rows are streamed in batches of this size instead of loaded all at once
+BATCH_SIZE = 500
+
+def count(model):
+    return db.session.query(db.func.count(model.id)).scalar()
+
+def stream(model, *options):
+    return model.query.options(*options).order_by(model.id).yield_per(BATCH_SIZE)
+
 def check_database():
     with app.app_context():
         print("=" * 60)
@@ -7,11 +18,11 @@ def check_database():
         print("=" * 60)
         
         # Check Donors
-        donors = Donor.query.all()
-        print(f"\n📋 DONORS ({len(donors)} total):")
+        donors_total = count(Donor)
+        print(f"\n📋 DONORS ({donors_total} total):")
         print("-" * 40)
-        if donors:
-            for donor in donors:
+        if donors_total:
+            for donor in stream(Donor):
                 print(f"ID: {donor.id}")
                 print(f"Name: {donor.name}")
                 print(f"Email: {donor.email}")
@@ -29,11 +40,11 @@ def check_database():
             print("No donors found in database.")
         
         # Check Receivers
-        receivers = Receiver.query.all()
-        print(f"\n📋 RECEIVERS ({len(receivers)} total):")
+        receivers_total = count(Receiver)
+        print(f"\n📋 RECEIVERS ({receivers_total} total):")
         print("-" * 40)
-        if receivers:
-            for receiver in receivers:
+        if receivers_total:
+            for receiver in stream(Receiver):
                 print(f"ID: {receiver.id}")
                 print(f"Name: {receiver.name}")
                 print(f"Email: {receiver.email}")
@@ -47,11 +58,11 @@ def check_database():
             print("No receivers found in database.")
         
         # Check Admins
-        admins = Admin.query.all()
-        print(f"\n👤 ADMINS ({len(admins)} total):")
+        admins_total = count(Admin)
+        print(f"\n👤 ADMINS ({admins_total} total):")
         print("-" * 40)
-        if admins:
-            for admin in admins:
+        if admins_total:
+            for admin in stream(Admin):
                 print(f"ID: {admin.id}")
                 print(f"Name: {admin.name}")
                 print(f"Email: {admin.email}")
@@ -60,11 +71,12 @@ def check_database():
             print("No admins found in database.")
         
         # Check Blood Requests
-        requests = BloodRequest.query.all()
-        print(f"\n🩸 BLOOD REQUESTS ({len(requests)} total):")
+        requests_total = count(BloodRequest)
+        print(f"\n🩸 BLOOD REQUESTS ({requests_total} total):")
         print("-" * 40)
-        if requests:
-            for request in requests:
+        if requests_total:
+            # Receiver names come with the same query, not one query per request
+            for request in stream(BloodRequest, joinedload(BloodRequest.receiver)):
                 print(f"ID: {request.id}")
                 print(f"Receiver: {request.receiver.name}")
                 print(f"Blood Group Needed: {request.blood_group_needed}")
@@ -80,11 +92,11 @@ def check_database():
             print("No blood requests found in database.")
         
         # Check Donation Responses
-        responses = DonationResponse.query.all()
-        print(f"\n💬 DONATION RESPONSES ({len(responses)} total):")
+        responses_total = count(DonationResponse)
+        print(f"\n💬 DONATION RESPONSES ({responses_total} total):")
         print("-" * 40)
-        if responses:
-            for response in responses:
+        if responses_total:
+            for response in stream(DonationResponse, joinedload(DonationResponse.donor)):
                 print(f"ID: {response.id}")
                 print(f"Donor: {response.donor.name}")
                 print(f"Request ID: {response.request_id}")
@@ -99,11 +111,11 @@ def check_database():
             print("No donation responses found in database.")
         
         # Check Donation History
-        donations = DonationHistory.query.all()
-        print(f"\n📊 DONATION HISTORY ({len(donations)} total):")
+        donations_total = count(DonationHistory)
+        print(f"\n📊 DONATION HISTORY ({donations_total} total):")
         print("-" * 40)
-        if donations:
-            for donation in donations:
+        if donations_total:
+            for donation in stream(DonationHistory):
                 print(f"ID: {donation.id}")
                 print(f"Donor: {donation.donor_id}")
                 print(f"Blood Type: {donation.blood_type}")
@@ -1,15 +1,20 @@
-from app import db, app, Admin
-from werkzeug.security import generate_password_hash
+from app import db, app, Admin, password_policy
 import os
 
-# Delete the existing database file completely
-db_path = 'instance/blood_finder.db'
-if os.path.exists(db_path):
-    os.remove(db_path)
-    print("Old database file deleted")
-
 # Create database and tables from scratch
 with app.app_context():
+    # Delete the existing database (the file for SQLite, every table otherwise)
+    db_path = db.engine.url.database if db.engine.url.get_backend_name() == 'sqlite' else None
+    if db_path:
+        db.engine.dispose()
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        print("Old database file deleted")
+    else:
+        db.drop_all()
+        print("Old database tables dropped")
+    
     # Create new tables (this will only create Donor, Receiver, Admin)
     db.create_all()
     
@@ -17,7 +22,7 @@ with app.app_context():
     admin = Admin(
         name='Administrator',
         email='admin@bloodfinder.com',
-        password=generate_password_hash('admin123')
+        password=password_policy.hash('admin123')
     )
     db.session.add(admin)
     db.session.commit()
@@ -3,47 +3,40 @@
 Script to manually clear all donation responses for a specific donor
 """
 
-import sqlite3
 import sys
 
+from app import app, db, DonationResponse
+
 def clear_donor_responses(donor_id=1):
     """Clear all donation responses for a specific donor"""
-    try:
-        # Connect to database
-        conn = sqlite3.connect('instance/blood_finder.db')
-        cursor = conn.cursor()
-        
-        # First, show current responses
-        cursor.execute('SELECT COUNT(*) FROM donation_response WHERE donor_id = ?', (donor_id,))
-        current_count = cursor.fetchone()[0]
-        print(f"Current responses for donor {donor_id}: {current_count}")
-        
-        if current_count == 0:
-            print("No responses to delete.")
+    # Goes through the app's engine (DATABASE_URL), so it works on any backend
+    with app.app_context():
+        try:
+            # First, show current responses
+            current_count = DonationResponse.query.filter_by(donor_id=donor_id).count()
+            print(f"Current responses for donor {donor_id}: {current_count}")
+            
+            if current_count == 0:
+                print("No responses to delete.")
+                return True
+            
+            # Delete all responses for the donor
+            affected = DonationResponse.query.filter_by(donor_id=donor_id).delete()
+            db.session.commit()
+            
+            print(f"✅ Deleted {affected} responses for donor {donor_id}")
+            
+            # Show total remaining
+            total_remaining = DonationResponse.query.count()
+            print(f"Total responses remaining in database: {total_remaining}")
             return True
-        
-        # Delete all responses for the donor
-        cursor.execute('DELETE FROM donation_response WHERE donor_id = ?', (donor_id,))
-        affected = cursor.rowcount
-        conn.commit()
-        
-        print(f"✅ Deleted {affected} responses for donor {donor_id}")
-        
-        # Show total remaining
-        cursor.execute('SELECT COUNT(*) FROM donation_response')
-        total_remaining = cursor.fetchone()[0]
-        print(f"Total responses remaining in database: {total_remaining}")
-        
-        conn.close()
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        if 'conn' in locals():
-            conn.close()
-        return False
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error: {str(e)}")
+            return False
 
 if __name__ == "__main__":
     donor_id = int(sys.argv[1]) if len(sys.argv) > 1 else 1
     success = clear_donor_responses(donor_id)
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    sys.exit(0 if success else 1)
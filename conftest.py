@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database and geocode cache (which also holds
+# the shared Nominatim rate limit) before any test module imports it, so
+# pytest never touches instance/blood_finder.db or instance/geocode_cache.db
+_test_dir = tempfile.mkdtemp(prefix='blood_finder_test_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_test_dir, 'test.db'))
+os.environ.setdefault('GEOCODE_CACHE_PATH', os.path.join(_test_dir, 'geocode_cache.db'))
+
+from app import app, db
+
+with app.app_context():
+    db.create_all()
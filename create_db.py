@@ -1,5 +1,4 @@
-from app import db, app, Admin
-from werkzeug.security import generate_password_hash
+from app import db, app, Admin, password_policy
 
 # Create database and tables
 with app.app_context():
@@ -21,7 +20,7 @@ with app.app_context():
     admin = Admin(
         name='Administrator',
         email='admin@bloodfinder.com',
-        password=generate_password_hash('admin123')
+        password=password_policy.hash('admin123')
     )
     db.session.add(admin)
     db.session.commit()
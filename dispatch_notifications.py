@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Notification dispatcher: delivers the outbox (see notifications.py)
+
+Usage: python dispatch_notifications.py [--once] [--poll SECONDS]
+       python dispatch_notifications.py --load-test N [--batch-size B] [--fail-rate F]
+
+Runs until interrupted, sending due messages in batches per channel with
+the transports, rate limits and retry settings from the NOTIFY_* config in
+app.py; --once drains what is due and exits. Run a single dispatcher on
+SQLite; on PostgreSQL several can share the outbox.
+
+--load-test N queues N alerts per channel in a throwaway database, delivers
+them through the local file transports (optionally failing a share of the
+sends to exercise retries) and reports enqueue and delivery throughput.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def dispatcher_for(app, db, outbox, transports, backoff_seconds=None):
+    from notifications import Dispatcher
+    return Dispatcher(
+        db.engine, outbox, transports,
+        max_attempts=app.config['NOTIFY_MAX_ATTEMPTS'],
+        backoff_seconds=app.config['NOTIFY_BACKOFF_SECONDS'] if backoff_seconds is None else backoff_seconds,
+    )
+
+
+class FlakyTransport:
+    """Wraps a transport and fails a random share of its messages"""
+
+    def __init__(self, transport, fail_rate):
+        self.transport = transport
+        self.fail_rate = fail_rate
+        self.batch_size = transport.batch_size
+        self.rate = transport.rate
+
+    def send(self, messages):
+        failed = {message.id: 'simulated failure' for message in messages if random.random() < self.fail_rate}
+        self.transport.send([message for message in messages if message.id not in failed])
+        return failed
+
+
+def load_test(count, batch_size, fail_rate):
+    # A throwaway database, set before app.py reads DATABASE_URL
+    workdir = tempfile.mkdtemp(prefix='notify_load_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'load.db')
+    from app import app, db, outbox
+    from notifications import CHANNELS, FileTransport
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            for start in range(0, count, 5000):
+                outbox.enqueue(conn, [
+                    {'dedup_key': f'{channel}:load-{n}', 'channel': channel, 'recipient': f'donor{n}@load.test',
+                     'subject': 'Critical: O- blood needed', 'body': 'Load test message ' * 8}
+                    for n in range(start, min(start + 5000, count)) for channel in CHANNELS
+                ])
+        enqueue_seconds = time.perf_counter() - started
+        total = count * len(CHANNELS)
+        print(f"📥 Queued {total} messages in {enqueue_seconds:.2f}s ({total / enqueue_seconds:.0f} msg/s)")
+
+        transports = {}
+        for channel in CHANNELS:
+            transports[channel] = FileTransport(os.path.join(workdir, f'{channel}.jsonl'), batch_size=batch_size)
+            if fail_rate:
+                transports[channel] = FlakyTransport(transports[channel], fail_rate)
+        # No backoff, so retries are due straight away
+        dispatcher = dispatcher_for(app, db, outbox, transports, backoff_seconds=0)
+        started = time.perf_counter()
+        dispatcher.run_once()
+        send_seconds = time.perf_counter() - started
+        with db.engine.connect() as conn:
+            counts = outbox.counts(conn)
+
+    totals = dispatcher.totals
+    print(f"📤 Delivered {totals['sent']} messages in {send_seconds:.2f}s ({totals['sent'] / send_seconds:.0f} msg/s), "
+          f"batch size {batch_size}; {totals['retried']} retries, {totals['failed']} given up")
+    for (channel, status), number in sorted(counts.items()):
+        print(f"   {channel:<6} {status:<8} {number}")
+    print(f"   Output: {workdir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deliver queued donor notifications')
+    parser.add_argument('--once', action='store_true', help='send what is due, then exit')
+    parser.add_argument('--poll', type=float, default=5.0, help='seconds between outbox polls (default: 5)')
+    parser.add_argument('--load-test', type=int, metavar='N', help='offline throughput test with N alerts per channel')
+    parser.add_argument('--batch-size', type=int, default=500, help='load test: messages per batch')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='load test: share of sends that fail')
+    args = parser.parse_args()
+
+    if args.load_test:
+        load_test(args.load_test, args.batch_size, args.fail_rate)
+        return 0
+
+    from app import app, db, outbox
+    from notifications import build_transports
+    with app.app_context():
+        transports = build_transports(app.config, app.instance_path)
+        dispatcher = dispatcher_for(app, db, outbox, transports)
+        print(f"📣 Dispatching {', '.join(f'{c} via {type(t).__name__}' for c, t in transports.items())}")
+        try:
+            if args.once:
+                dispatcher.run_once()
+            else:
+                dispatcher.run(args.poll)
+        except KeyboardInterrupt:
+            pass
+    totals = dispatcher.totals
+    print(f"✅ {totals['sent']} sent, {totals['retried']} retried, {totals['failed']} given up")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
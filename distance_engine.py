@@ -0,0 +1,88 @@
+import heapq
+import math
+
+from geopy.distance import geodesic
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to a plain Python loop
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+# Haversine differs from the geodesic distance by at most ~0.5%
+HAVERSINE_ERROR = 0.005
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Great-circle distance in km from one point to many points
+    Takes the recipient point plus sequences of donor latitudes/longitudes
+    and returns all distances in a single vectorized pass
+    """
+    if np is None:
+        return [_haversine_scalar(lat, lon, lat2, lon2) for lat2, lon2 in zip(lats, lons)]
+
+    lat1 = math.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lats - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _haversine_scalar(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def distances_within(lat, lon, lats, lons, radius_km, refine=True, limit=None):
+    """
+    Filter donors to those within radius_km of (lat, lon)
+    Returns (indices, distances) sorted by distance; the radius check and the
+    order use exact distances, only the returned ones are rounded to 3 places
+    With limit, only the nearest `limit` are selected (partial selection, no full sort)
+    Haversine decides clear cases; with refine=True only candidates whose
+    haversine distance is within the error margin of the radius boundary
+    are recomputed with the exact geodesic distance
+    """
+    distances = haversine_km(lat, lon, lats, lons)
+    margin = radius_km * HAVERSINE_ERROR
+
+    if np is None:
+        results = []
+        for i, distance in enumerate(distances):
+            if distance > radius_km + margin:
+                continue
+            if refine and distance >= radius_km - margin:
+                distance = geodesic((lat, lon), (lats[i], lons[i])).kilometers
+            if distance <= radius_km:
+                results.append((distance, i))
+        if limit is not None:
+            results = heapq.nsmallest(limit, results)
+        else:
+            results.sort()
+        return [i for _, i in results], [round(d, 3) for d, _ in results]
+
+    candidates = np.nonzero(distances <= radius_km + margin)[0]
+    candidate_distances = distances[candidates]
+    if refine:
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        for j in np.nonzero(candidate_distances >= radius_km - margin)[0]:
+            i = candidates[j]
+            candidate_distances[j] = geodesic((lat, lon), (lats[i], lons[i])).kilometers
+
+    inside = candidate_distances <= radius_km
+    candidates = candidates[inside]
+    candidate_distances = candidate_distances[inside]
+    if limit is not None and limit < len(candidates):
+        # Partial selection of the nearest `limit`, then sort only those
+        nearest = np.argpartition(candidate_distances, limit - 1)[:limit]
+        candidates = candidates[nearest]
+        candidate_distances = candidate_distances[nearest]
+    order = np.argsort(candidate_distances, kind='stable')
+    return candidates[order].tolist(), np.round(candidate_distances[order], 3).tolist()
@@ -0,0 +1,239 @@
+import math
+import threading
+import time
+from array import array
+from collections import Counter
+
+from sqlalchemy import event, inspect, select
+
+from blood_compatibility import BLOOD_GROUP_CODES, blood_group_code
+from distance_engine import distances_within, np
+from spatial_index import bounding_box
+
+
+class DonorSnapshot:
+    """
+    Compact, process-wide struct-of-arrays copy of donor search fields
+    One row per donor: id, blood group code, latitude, longitude, availability
+    Donors without coordinates are stored with NaN lat/lon and never match
+    a radius query. Each worker process keeps its own snapshot; SnapshotSync
+    applies the process's own commits to it and tells when another writer
+    changed donors, so it must be reloaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+        self.loaded = False
+        # Donor version (see SnapshotSync) the contents correspond to
+        self.version = None
+
+    def _clear(self):
+        self.ids = array('q')
+        self.blood = array('b')
+        self.lat = array('d')
+        self.lon = array('d')
+        self.available = array('b')
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self, rows, version=None):
+        """
+        Replace the snapshot contents
+        rows: iterable of (id, blood_group, latitude, longitude, availability)
+        """
+        # Build the new arrays outside the lock so queries keep running
+        # against the old ones during a reload
+        staging = DonorSnapshot()
+        for row in rows:
+            staging._append(*row)
+        with self._lock:
+            self.ids, self.blood, self.lat, self.lon = staging.ids, staging.blood, staging.lat, staging.lon
+            self.available, self._rows = staging.available, staging._rows
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self.version = version
+
+    def age(self):
+        """Seconds since the last load"""
+        return time.monotonic() - self.loaded_at if self.loaded else math.inf
+
+    def _append(self, donor_id, blood_group, latitude, longitude, availability):
+        self._rows[donor_id] = len(self.ids)
+        self.ids.append(donor_id)
+        self.blood.append(blood_group_code(blood_group))
+        self.lat.append(math.nan if latitude is None else latitude)
+        self.lon.append(math.nan if longitude is None else longitude)
+        self.available.append(1 if availability else 0)
+
+    def _upsert(self, donor_id, blood_group, latitude, longitude, availability):
+        row = self._rows.get(donor_id)
+        if row is None:
+            self._append(donor_id, blood_group, latitude, longitude, availability)
+            return
+        self.blood[row] = blood_group_code(blood_group)
+        self.lat[row] = math.nan if latitude is None else latitude
+        self.lon[row] = math.nan if longitude is None else longitude
+        self.available[row] = 1 if availability else 0
+
+    def _remove(self, donor_id):
+        row = self._rows.pop(donor_id, None)
+        if row is None:
+            return
+        # Move the last row into the hole so the arrays stay dense
+        last = len(self.ids) - 1
+        if row != last:
+            for column in (self.ids, self.blood, self.lat, self.lon, self.available):
+                column[row] = column[last]
+            self._rows[self.ids[row]] = row
+        for column in (self.ids, self.blood, self.lat, self.lon, self.available):
+            column.pop()
+
+    def upsert(self, donor_id, blood_group, latitude, longitude, availability):
+        with self._lock:
+            if self.loaded:
+                self._upsert(donor_id, blood_group, latitude, longitude, availability)
+
+    def remove(self, donor_id):
+        with self._lock:
+            self._remove(donor_id)
+
+    def advance(self, base, version, rows, removed):
+        """
+        Apply one committed transaction's donor changes if the snapshot is
+        at `base`, the version before that transaction, and move it to
+        `version`; otherwise leave it for a reload. Returns whether applied
+        """
+        with self._lock:
+            if not self.loaded or self.version != base:
+                return False
+            for row in rows:
+                self._upsert(*row)
+            for donor_id in removed:
+                self._remove(donor_id)
+            self.version = version
+            return True
+
+    def query(self, lat, lon, radius_km, blood_groups=None, limit=None):
+        """
+        Find available donors within radius_km of (lat, lon)
+        blood_groups: optional iterable of accepted blood group strings
+        Returns a list of (donor_id, distance_km) nearest first, at most limit long
+        """
+        codes = None
+        if blood_groups is not None:
+            codes = [BLOOD_GROUP_CODES[group] for group in blood_groups if group in BLOOD_GROUP_CODES]
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+
+        with self._lock:
+            if np is None:
+                candidates = [
+                    row for row in range(len(self.ids))
+                    if self.available[row]
+                    and (codes is None or self.blood[row] in codes)
+                    and min_lat <= self.lat[row] <= max_lat
+                    and min_lon <= self.lon[row] <= max_lon
+                ]
+                lats = [self.lat[row] for row in candidates]
+                lons = [self.lon[row] for row in candidates]
+                candidate_ids = [self.ids[row] for row in candidates]
+            else:
+                # Zero-copy views; they must not outlive the lock
+                lat_view = np.frombuffer(self.lat, dtype=np.float64)
+                lon_view = np.frombuffer(self.lon, dtype=np.float64)
+                mask = np.frombuffer(self.available, dtype=np.int8) == 1
+                if codes is not None:
+                    mask &= np.isin(np.frombuffer(self.blood, dtype=np.int8), codes)
+                mask &= (lat_view >= min_lat) & (lat_view <= max_lat)
+                mask &= (lon_view >= min_lon) & (lon_view <= max_lon)
+                candidates = np.nonzero(mask)[0]
+                lats = lat_view[candidates]
+                lons = lon_view[candidates]
+                candidate_ids = np.frombuffer(self.ids, dtype=np.int64)[candidates]
+                del lat_view, lon_view, mask
+
+        indices, distances = distances_within(lat, lon, lats, lons, radius_km, limit=limit)
+        return [(int(candidate_ids[i]), distance) for i, distance in zip(indices, distances)]
+
+
+SEARCH_FIELDS = ('blood_group', 'latitude', 'longitude', 'availability')
+
+
+class SnapshotSync:
+    """
+    Keeps the donor snapshots of every process in step with donor writes
+
+    Each transaction that changes donor search fields bumps a version
+    counter (a stats row, see stats.py) in the same transaction: ORM writes
+    at flush time, bulk insert/update/delete statements just before they
+    run. On commit, this process applies its own ORM changes to its
+    snapshot; any other change (another process, a script, a bulk
+    statement) leaves the snapshot behind the stored version, and the next
+    search reloads it.
+    """
+
+    def __init__(self, snapshot, model, tracker, key='donors.version'):
+        self.snapshot = snapshot
+        self.model = model
+        self.tracker = tracker
+        self.key = key
+
+    def install(self, session):
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'do_orm_execute', self._before_bulk_write)
+        event.listen(session, 'after_commit', self._after_commit)
+        event.listen(session, 'after_rollback', self._after_rollback)
+
+    def version(self, conn):
+        """Stored donor version (0 before the first donor write)"""
+        return conn.execute(
+            select(self.tracker.table.c.value).where(self.tracker.table.c.key == self.key)
+        ).scalar() or 0
+
+    def _row(self, obj):
+        return (obj.id, obj.blood_group, obj.latitude, obj.longitude, obj.availability)
+
+    def _bump(self, session, rows=(), removed=(), bulk=False):
+        conn = session.connection()
+        self.tracker.apply(conn, Counter({self.key: 1}))
+        # The version row stays locked by this transaction until it ends
+        version = self.version(conn)
+        pending = session.info.setdefault('donor_snapshot', {
+            'base': version - 1, 'rows': {}, 'removed': set(), 'bulk': False
+        })
+        pending['version'] = version
+        pending['bulk'] |= bulk
+        for row in rows:
+            pending['rows'][row[0]] = row
+            pending['removed'].discard(row[0])
+        for donor_id in removed:
+            pending['rows'].pop(donor_id, None)
+            pending['removed'].add(donor_id)
+
+    def _after_flush(self, session, flush_context):
+        # new/dirty/deleted and attribute history still describe the flush here
+        rows = [self._row(obj) for obj in session.new if isinstance(obj, self.model)]
+        rows += [self._row(obj) for obj in session.dirty if isinstance(obj, self.model)
+                 and any(inspect(obj).attrs[field].history.has_changes() for field in SEARCH_FIELDS)]
+        removed = [obj.id for obj in session.deleted if isinstance(obj, self.model)]
+        if rows or removed:
+            self._bump(session, rows, removed)
+
+    def _before_bulk_write(self, orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is None or table.name != self.model.__table__.name:
+            return
+        self._bump(orm_execute_state.session, bulk=True)
+
+    def _after_commit(self, session):
+        pending = session.info.pop('donor_snapshot', None)
+        if pending is None or pending['bulk']:
+            return
+        self.snapshot.advance(pending['base'], pending['version'], pending['rows'].values(), pending['removed'])
+
+    def _after_rollback(self, session):
+        session.info.pop('donor_snapshot', None)
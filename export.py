@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Export a table or joined view as CSV, JSONL or Parquet
+
+Usage: python export.py VIEW [--format csv|jsonl|parquet] [--output FILE] [--batch-size N]
+
+VIEW is one of donors, receivers, requests, responses, donation_history
+(see EXPORT_VIEWS in app.py). Rows are streamed in batches, so memory use
+stays flat however large the table is. Without --output, CSV and JSONL go
+to stdout.
+"""
+
+import argparse
+import sys
+
+from app import app, db, EXPORT_VIEWS
+from exports import available_formats, export_chunks
+
+
+def export(view, file_format, out, batch_size=1000):
+    """Write one view to a binary file object, returns the bytes written"""
+    written = 0
+    with app.app_context():
+        for chunk in export_chunks(db.session, EXPORT_VIEWS[view], file_format, batch_size):
+            out.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a table to CSV, JSONL or Parquet')
+    parser.add_argument('view', choices=sorted(EXPORT_VIEWS))
+    parser.add_argument('--format', default='csv', choices=['csv', 'jsonl', 'parquet'])
+    parser.add_argument('--output', help='file to write (default: stdout)')
+    parser.add_argument('--batch-size', type=int, default=app.config['EXPORT_BATCH_SIZE'])
+    args = parser.parse_args()
+
+    if args.format not in available_formats():
+        parser.error('Parquet export needs pyarrow (pip install pyarrow)')
+    if args.output is None and args.format == 'parquet':
+        parser.error('Parquet needs --output')
+
+    if args.output is None:
+        export(args.view, args.format, sys.stdout.buffer, args.batch_size)
+        return 0
+    with open(args.output, 'wb') as out:
+        written = export(args.view, args.format, out, args.batch_size)
+    print(f"✅ Exported {args.view} to {args.output} ({written / 1024:.0f} KiB)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
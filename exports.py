@@ -0,0 +1,124 @@
+"""
+Streaming table exports (CSV, JSONL, Parquet)
+
+Rows are read with yield_per, which uses a server-side cursor where the
+driver has one (psycopg2) and fetches in batches everywhere else, and each
+batch is encoded and handed on before the next one is read. Memory use
+depends on the batch size, not on the size of the table, so the same
+generators back both the export CLI (python export.py) and the chunked
+HTTP responses of the admin export endpoint.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only the Parquet format needs it
+    pa = pq = None
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def available_formats():
+    return [name for name in CONTENT_TYPES if name != 'parquet' or pq is not None]
+
+
+def stream_batches(session, statement, batch_size=1000):
+    """Yield lists of row tuples from a select, batch_size rows at a time"""
+    result = session.execute(statement.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def jsonl_chunks(columns, batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps({column: _json_value(value) for column, value in zip(columns, row)}) + '\n'
+            for row in batch
+        ).encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def arrow_schema(selected_columns):
+    """Parquet column types from the SQL column types; anything else is a string"""
+    types = [(Boolean, pa.bool_()), (Integer, pa.int64()), (Float, pa.float64()),
+             (DateTime, pa.timestamp('us')), (Date, pa.date32())]
+    fields = []
+    for column in selected_columns:
+        arrow_type = next((arrow for sql, arrow in types if isinstance(column.type, sql)), pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def parquet_chunks(columns, batches, schema):
+    """One Parquet row group per batch; the footer comes with the last chunk"""
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in batches:
+        writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in batch], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_chunks(session, statement, file_format, batch_size=1000):
+    """Encoded chunks (bytes) of a select's rows in the given format"""
+    columns = [column.name for column in statement.selected_columns]
+    batches = stream_batches(session, statement, batch_size)
+    if file_format == 'csv':
+        return csv_chunks(columns, batches)
+    if file_format == 'jsonl':
+        return jsonl_chunks(columns, batches)
+    if file_format == 'parquet':
+        if pq is None:
+            raise RuntimeError('Parquet export needs pyarrow (pip install pyarrow)')
+        return parquet_chunks(columns, batches, arrow_schema(statement.selected_columns))
+    raise ValueError(f'Unknown export format "{file_format}"')
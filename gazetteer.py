@@ -0,0 +1,273 @@
+"""
+Offline gazetteer: geocoding of Indian place names and pincodes without
+network calls
+
+A bundled table (data/gazetteer_in.tsv.gz, regenerated by
+build_gazetteer.py) is loaded into memory once. geocode() resolves an
+address by, in turn:
+
+1. a 6-digit pincode in it
+2. exact names/aliases of its comma separated parts and their word
+   n-grams, most specific part first ("prashant nagar hubli" -> Hubballi)
+3. a fuzzy match of those parts over a trigram index ("belgavi" ->
+   Belagavi), accepted above min_similarity
+
+A state, or another place named in the address, picks between places of
+the same name: "Shivajinagar, Pune" is the one within context_km of Pune.
+The result is final only if every part of the address but the state
+names that place or one near it. Otherwise ("12 MG Road, Bengaluru",
+"Manipal Hospital, Old Airport Road, Bangalore") geocode() returns None,
+so the caller asks Nominatim for the street or building, and
+geocode(partial=True) gives the city as a fallback. reverse() returns the
+nearest place within max_km, looking only at the grid cells around the
+point.
+"""
+
+import csv
+import gzip
+import io
+import re
+from collections import defaultdict
+
+from distance_engine import haversine_km
+from spatial_index import bounding_box, cell_ranges, grid_cell
+
+COLUMNS = ['name', 'aliases', 'district', 'state', 'pincode', 'latitude', 'longitude', 'kind']
+
+# Single words that name too many places to identify one on their own
+STOPWORDS = {
+    'road', 'nagar', 'layout', 'colony', 'street', 'main', 'cross', 'hospital', 'near', 'opp',
+    'stage', 'phase', 'sector', 'block', 'city', 'town', 'east', 'west', 'north', 'south', 'new', 'old',
+}
+# A place name followed by one of these is a street ("Mysore Road, Bangalore")
+STREET_WORDS = {'road', 'rd', 'street', 'st', 'marg', 'cross', 'circle', 'highway', 'main'}
+
+PINCODE = re.compile(r'\b(\d{6})\b')
+
+
+def normalize_name(text):
+    """Lowercase, punctuation to spaces, collapsed whitespace"""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', (text or '').lower()).split())
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Place:
+    __slots__ = ('name', 'district', 'state', 'pincode', 'latitude', 'longitude', 'kind')
+
+    def __init__(self, name, district, state, pincode, latitude, longitude, kind):
+        self.name = name
+        self.district = district
+        self.state = state
+        self.pincode = pincode
+        self.latitude = latitude
+        self.longitude = longitude
+        self.kind = kind
+
+    @property
+    def address(self):
+        parts = [self.name]
+        if self.district and self.district != self.name:
+            parts.append(self.district)
+        parts.append(f'{self.state} {self.pincode}' if self.pincode else self.state)
+        parts.append('India')
+        return ', '.join(parts)
+
+
+def read_table(path):
+    """Rows of a gazetteer table as dicts (.gz or plain TSV)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f, delimiter='\t')
+
+
+def write_table(path, rows):
+    """Write rows (dicts with COLUMNS) as a gzip-compressed TSV"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, COLUMNS, delimiter='\t', lineterminator='\n', extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    # mtime=0 keeps the file byte-identical across rebuilds
+    with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+        f.write(buffer.getvalue().encode('utf-8'))
+
+
+class Gazetteer:
+    """
+    In-memory place table with exact, pincode, fuzzy and nearest-point lookups
+    Earlier rows win ties, so the table lists bigger places first
+    """
+
+    def __init__(self, rows, min_similarity=0.7, reverse_max_km=10, context_km=50):
+        self.min_similarity = min_similarity
+        self.reverse_max_km = reverse_max_km
+        # How far apart two places named in one address may be
+        self.context_km = context_km
+        self.places = []
+        self.by_name = defaultdict(list)
+        self.by_pincode = {}
+        self.by_cell = defaultdict(list)
+        self.by_trigram = defaultdict(set)
+        self.trigram_counts = {}
+        self.states = set()
+        for row in rows:
+            place = Place(row['name'], row['district'], row['state'], row['pincode'],
+                          float(row['latitude']), float(row['longitude']), row['kind'])
+            index = len(self.places)
+            self.places.append(place)
+            for name in [place.name] + [alias for alias in row['aliases'].split('|') if alias]:
+                key = normalize_name(name)
+                if index not in self.by_name[key]:
+                    self.by_name[key].append(index)
+            if place.pincode:
+                self.by_pincode.setdefault(place.pincode, index)
+            self.by_cell[grid_cell(place.latitude, place.longitude)].append(index)
+            self.states.add(normalize_name(place.state))
+        for key in self.by_name:
+            grams = trigrams(key)
+            self.trigram_counts[key] = len(grams)
+            for gram in grams:
+                self.by_trigram[gram].add(key)
+
+    @classmethod
+    def load(cls, path, **options):
+        return cls(read_table(path), **options)
+
+    def __len__(self):
+        return len(self.places)
+
+    def _result(self, index):
+        place = self.places[index]
+        return {
+            'latitude': place.latitude,
+            'longitude': place.longitude,
+            'full_address': place.address,
+            'success': True
+        }
+
+    def _exact(self, part):
+        """
+        Indices of places named by the longest word n-gram of a part, and
+        whether that n-gram is the whole part
+        """
+        words = part.split()
+        for size in range(len(words), 0, -1):
+            found = []
+            for start in range(len(words) - size + 1):
+                key = ' '.join(words[start:start + size])
+                if size == 1 and key in STOPWORDS:
+                    continue
+                if start + size < len(words) and words[start + size] in STREET_WORDS:
+                    continue
+                found += self.by_name.get(key, [])
+            if found:
+                return found, size == len(words)
+        return [], False
+
+    def _similar(self, text):
+        """(score, name key) of the name most similar to text"""
+        grams = trigrams(text)
+        shared = defaultdict(int)
+        for gram in grams:
+            for key in self.by_trigram.get(gram, ()):
+                shared[key] += 1
+        best = (0, None)
+        for key, count in shared.items():
+            # Dice coefficient of the two trigram sets
+            best = max(best, (2 * count / (len(grams) + self.trigram_counts[key]), key))
+        return best
+
+    def _fuzzy(self, part):
+        """
+        Indices of places named most like the part or one of its words, if
+        similar enough, and whether the whole part was the match
+        """
+        texts = [part] if len(part) >= 4 else []
+        texts += [word for word in part.split() if len(word) >= 5 and word not in STOPWORDS]
+        score, key, text = max(((*self._similar(text), text) for text in dict.fromkeys(texts)),
+                               default=(0, None, None))
+        if score < self.min_similarity:
+            return [], False
+        return self.by_name[key], text == part
+
+    def _near(self, index, others):
+        place = self.places[index]
+        distances = haversine_km(place.latitude, place.longitude, [self.places[i].latitude for i in others],
+                                 [self.places[i].longitude for i in others])
+        return min(distances) <= self.context_km
+
+    def _match(self, parts, states, lookup):
+        """
+        Most specific part's place that lies near the places named by the
+        other parts ("Sagar Hospital, Jayanagar, Bangalore" is not Sagar
+        town); if none does, the place of the last part, usually the city
+        """
+        matches = []
+        for part in parts:
+            candidates, _ = lookup(part)
+            in_state = [index for index in candidates if normalize_name(self.places[index].state) in states]
+            matches.append(in_state or candidates)
+        for i, candidates in enumerate(matches):
+            others = [index for j, found in enumerate(matches) if j != i for index in found]
+            for index in candidates:
+                if not others or self._near(index, others):
+                    return index
+        return next((candidates[0] for candidates in reversed(matches) if candidates), None)
+
+    def _names(self, part, index):
+        """Whether a whole address part names the place at index or one near it"""
+        for lookup in (self._exact, self._fuzzy):
+            candidates, whole = lookup(part)
+            if whole and (index in candidates or self._near(index, candidates)):
+                return True
+        return False
+
+    def geocode(self, address, partial=False):
+        """
+        geocode_address_free-style result for an address, or None on a miss
+        partial: also return the place of an address with parts the
+        gazetteer cannot place (a street, a building)
+        """
+        pincode = PINCODE.search(address or '')
+        parts = [normalize_name(part) for part in PINCODE.sub(' ', address or '').split(',')]
+        parts = [part for part in parts if part and part != 'india']
+        states = {part for part in parts if part in self.states}
+        if pincode and pincode.group(1) in self.by_pincode:
+            index = self.by_pincode[pincode.group(1)]
+        else:
+            index = self._match(parts, states, self._exact)
+            if index is None:
+                index = self._match(parts, states, self._fuzzy)
+        if index is None:
+            return None
+        if not partial and not all(self._names(part, index) for part in parts if part not in states):
+            return None
+        return self._result(index)
+
+    def nearest(self, lat, lon, max_km=None):
+        """(place, distance_km) of the nearest place within max_km, or None"""
+        max_km = self.reverse_max_km if max_km is None else max_km
+        ranges = cell_ranges(*bounding_box(lat, lon, max_km))
+        if ranges is None:
+            candidates = range(len(self.places))
+        else:
+            candidates = [index for low, high in ranges for cell in range(low, high + 1)
+                          for index in self.by_cell.get(cell, ())]
+        if not candidates:
+            return None
+        distances = haversine_km(lat, lon, [self.places[i].latitude for i in candidates],
+                                 [self.places[i].longitude for i in candidates])
+        distance, index = min(zip(distances, candidates))
+        if distance > max_km:
+            return None
+        return self.places[index], float(distance)
+
+    def reverse(self, lat, lon, max_km=None):
+        """reverse_geocode_free-style result for a point, or None on a miss"""
+        found = self.nearest(float(lat), float(lon), max_km)
+        if found is None:
+            return None
+        return {'address': found[0].address, 'success': True}
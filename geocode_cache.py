@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_address(address):
+    """
+    Normalize an address string into a cache key
+    Lowercases, trims and collapses repeated whitespace
+    """
+    return ' '.join((address or '').lower().split())
+
+
+class GeocodeCache:
+    """
+    Two tier cache for geocoding results
+    - In-process LRU tier for hot addresses
+    - SQLite tier that survives restarts, with TTL
+    Failed lookups ("address not found") are cached too, with a shorter TTL
+    """
+
+    def __init__(self, path, max_entries=1024, ttl_days=30, negative_ttl_days=1):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # Several worker threads/processes share this file
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS geocode_cache ('
+                ' query TEXT PRIMARY KEY,'
+                ' success INTEGER NOT NULL,'
+                ' latitude REAL,'
+                ' longitude REAL,'
+                ' full_address TEXT,'
+                ' expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _remember(self, key, result, expires_at):
+        # Caller must hold self._lock
+        self._memory[key] = (result, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, query):
+        """
+        Return the cached result dict for a query, or None on a miss
+        """
+        key = normalize_address(query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return dict(result)
+                del self._memory[key]
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT success, latitude, longitude, full_address, expires_at '
+                    'FROM geocode_cache WHERE query = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Geocode cache read error: {e}")
+            row = None
+
+        if row is None or row[4] <= now:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if row[0]:
+            result = {
+                'latitude': row[1],
+                'longitude': row[2],
+                'full_address': row[3],
+                'success': True
+            }
+        else:
+            result = {'success': False, 'error': f'Address "{query}" not found'}
+
+        with self._lock:
+            self._remember(key, result, row[4])
+            self.disk_hits += 1
+        return dict(result)
+
+    def set(self, query, result):
+        """
+        Store a geocoding result dict (successful or not found)
+        """
+        key = normalize_address(query)
+        success = bool(result.get('success'))
+        expires_at = time.time() + (self.ttl if success else self.negative_ttl)
+
+        with self._lock:
+            self._remember(key, dict(result), expires_at)
+
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO geocode_cache '
+                    '(query, success, latitude, longitude, full_address, expires_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, int(success), result.get('latitude'), result.get('longitude'),
+                     result.get('full_address'), expires_at)
+                )
+        except sqlite3.Error as e:
+            print(f"Geocode cache write error: {e}")
+
+    def purge_expired(self):
+        """
+        Delete expired rows from the SQLite tier, returns number removed
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                'DELETE FROM geocode_cache WHERE expires_at <= ?', (time.time(),)
+            ).rowcount
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory)
+            }
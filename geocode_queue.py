@@ -0,0 +1,146 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Blocking rate limiter shared by every thread that calls a service
+    Nominatim's usage policy allows at most 1 request per second
+    """
+
+    def __init__(self, min_interval=1.1):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def reserve(self, count=1):
+        """
+        Claim the next slot without waiting, returns seconds until it starts
+        count: requests made at once (e.g. a batch), each uses one interval;
+        they all start in this slot, so keep a batch to about one second's
+        worth of requests
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval * count
+        return slot - now
+
+    def wait(self, count=1):
+        """
+        Block until the caller is allowed to make the next request
+        """
+        delay = self.reserve(count)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SharedRateLimiter:
+    """
+    Like RateLimiter, but slots are shared by every process using the same
+    SQLite file, so web workers and offline jobs together stay within the
+    Nominatim limit
+    """
+
+    def __init__(self, path, min_interval=1.1, name='nominatim'):
+        self.min_interval = min_interval
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_limit (name TEXT PRIMARY KEY, next_slot REAL NOT NULL)')
+
+    def _connect(self):
+        # Autocommit mode: transactions are managed explicitly in wait()
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def reserve(self, count=1):
+        """
+        Claim the next slot without waiting, returns seconds until it starts
+        """
+        conn = self._connect()
+        try:
+            # Claim the next slot under the database write lock
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute('SELECT next_slot FROM rate_limit WHERE name = ?', (self.name,)).fetchone()
+            slot = max(now, row[0] if row else 0.0)
+            conn.execute('INSERT OR REPLACE INTO rate_limit (name, next_slot) VALUES (?, ?)',
+                         (self.name, slot + self.min_interval * count))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        return slot - now
+
+    def wait(self, count=1):
+        """
+        Block until the caller is allowed to make the next request
+        """
+        delay = self.reserve(count)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class GeocodeQueue:
+    """
+    Background worker pool that geocodes Donor/Receiver rows
+    Jobs are (kind, id) pairs; duplicate pending jobs are dropped
+    The handler is called inside an app context for each job
+    """
+
+    def __init__(self, app, handler, workers=2):
+        self.app = app
+        self.handler = handler
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"geocode-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, kind, ident):
+        """
+        Schedule a row for geocoding, returns False if it is already queued
+        """
+        job = (kind, ident)
+        with self._lock:
+            if job in self._pending:
+                return False
+            self._pending.add(job)
+        self.start()
+        self._queue.put(job)
+        return True
+
+    def is_pending(self, kind, ident):
+        with self._lock:
+            return (kind, ident) in self._pending
+
+    def join(self):
+        """
+        Block until every queued job has been processed
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            # No longer pending once started: a change made while the job
+            # runs (e.g. a location edit) must queue it again
+            with self._lock:
+                self._pending.discard(job)
+            try:
+                with self.app.app_context():
+                    self.handler(*job)
+            except Exception as e:
+                print(f"❌ Geocode job {job} failed: {e}")
+            finally:
+                self._queue.task_done()
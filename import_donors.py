@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Bulk donor import from CSV or JSONL
+
+Usage: python import_donors.py FILE [--format csv|jsonl] [--batch-size N]
+                               [--workers N] [--limit N] [--skip-geocode] [--restart]
+
+Records are streamed from the file, validated, and imported in batches:
+passwords are hashed on a process pool, each batch is one bulk INSERT
+transaction, and geocoding is queued once per distinct location (donors
+with latitude/longitude in the file are stored as geocoded, and matched to
+the active blood requests in the same transaction; the others are matched
+once geocoded). Running web servers reload their donor snapshot on their
+next search.
+
+Fields: name, email, age, gender, blood_group, location, contact (required),
+password, availability, latitude, longitude (optional). A donor without a
+password cannot log in until one is set.
+
+Progress is checkpointed to FILE.checkpoint after every committed batch, so
+an interrupted import resumes where it stopped; --restart ignores it.
+Rejected records are appended to FILE.rejects.jsonl with the reason.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert
+
+from app import app, db, Donor, geocode_queue, match_donor, password_policy
+from blood_compatibility import BLOOD_GROUP_CODES
+from spatial_index import grid_cell
+
+REQUIRED_FIELDS = ['name', 'email', 'age', 'gender', 'blood_group', 'location', 'contact']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'available'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'unavailable'}
+
+
+def read_records(path, file_format=None):
+    """Yield records (dicts) from a CSV or JSONL file, one at a time"""
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield {'_error': f'invalid JSON: {e}'}
+
+
+def parse_flag(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'invalid availability "{value}"')
+
+
+def validate(record):
+    """
+    Turn a raw record into Donor column values
+    Returns (values, password) or raises ValueError with the reason
+    """
+    if '_error' in record:
+        raise ValueError(record['_error'])
+    fields = {key: str(value).strip() for key, value in record.items() if key and value is not None}
+    missing = [field for field in REQUIRED_FIELDS if not fields.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    email = fields['email'].lower()
+    if '@' not in email:
+        raise ValueError(f'invalid email "{email}"')
+    blood_group = fields['blood_group'].upper()
+    if blood_group not in BLOOD_GROUP_CODES:
+        raise ValueError(f'invalid blood group "{fields["blood_group"]}"')
+    try:
+        age = int(fields['age'])
+    except ValueError:
+        raise ValueError(f'invalid age "{fields["age"]}"')
+    if not 18 <= age <= 65:
+        raise ValueError(f'age {age} outside 18-65')
+
+    values = {
+        'name': fields['name'],
+        'email': email,
+        'age': age,
+        'gender': fields['gender'],
+        'blood_group': blood_group,
+        'location': fields['location'],
+        'contact': fields['contact'],
+        'availability': parse_flag(record.get('availability')),
+        'latitude': None,
+        'longitude': None,
+        'geocoded': False,
+        'last_geocoded': None,
+        'grid_cell': None,
+    }
+    if fields.get('latitude') and fields.get('longitude'):
+        try:
+            latitude, longitude = float(fields['latitude']), float(fields['longitude'])
+        except ValueError:
+            raise ValueError('invalid latitude/longitude')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('latitude/longitude out of range')
+        values.update(latitude=latitude, longitude=longitude, geocoded=True,
+                      last_geocoded=datetime.now(), grid_cell=grid_cell(latitude, longitude))
+    return values, fields.get('password', '')
+
+
+class Checkpoint:
+    """Number of records already processed from a file, kept next to it"""
+
+    def __init__(self, source, restart=False):
+        self.path = source + '.checkpoint'
+        self.state = {'records': 0, 'inserted': 0, 'rejected': 0}
+        if os.path.exists(self.path) and not restart:
+            with open(self.path) as f:
+                self.state.update(json.load(f))
+
+    def save(self, records, inserted, rejected):
+        self.state = {'records': records, 'inserted': inserted, 'rejected': rejected}
+        # Write then rename, so an interruption never leaves a torn file
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def import_batch(batch, executor, seen_emails, rejects, line_offset):
+    """
+    Validate, hash and insert one batch in a single transaction
+    Returns (inserted donor rows, number rejected)
+    """
+    valid = []
+    rejected = 0
+    for number, record in enumerate(batch, start=line_offset):
+        try:
+            values, password = validate(record)
+            if values['email'] in seen_emails:
+                raise ValueError(f"duplicate email {values['email']} in file")
+        except ValueError as e:
+            rejected += 1
+            rejects.write(json.dumps({'record': number, 'error': str(e),
+                                      'data': {k: v for k, v in record.items() if k != 'password'}}) + '\n')
+            continue
+        seen_emails.add(values['email'])
+        valid.append((number, values, password))
+
+    # Emails already in the database (an earlier import, or a signup)
+    existing = set()
+    emails = [values['email'] for _, values, _ in valid]
+    if emails:
+        existing = {email for (email,) in db.session.query(Donor.email).filter(Donor.email.in_(emails))}
+    # End the read transaction before hashing: with SQLite WAL, the insert
+    # could not take the write lock after another process commits meanwhile
+    db.session.commit()
+    rows = []
+    for number, values, password in valid:
+        if values['email'] in existing:
+            rejected += 1
+            rejects.write(json.dumps({'record': number, 'error': f"email {values['email']} already registered"}) + '\n')
+            continue
+        rows.append((values, password))
+
+    if rows:
+        hashes = password_policy.hash_many([password for _, password in rows], executor)
+        donor_rows = [dict(values, password=hashed) for (values, _), hashed in zip(rows, hashes)]
+        ids = db.session.scalars(
+            insert(Donor).returning(Donor.id, sort_by_parameter_order=True), donor_rows
+        ).all()
+        for donor_id, row in zip(ids, donor_rows):
+            row['id'] = donor_id
+        conn = db.session.connection()
+        for row in donor_rows:
+            if row['geocoded']:
+                match_donor(conn, row['id'])
+        db.session.commit()
+        return donor_rows, rejected
+    db.session.commit()
+    return [], rejected
+
+
+def import_file(path, file_format=None, batch_size=500, workers=None, limit=None,
+                geocode=True, restart=False, report=print):
+    """
+    Import donors from path; returns a summary dict
+    workers: hashing processes (None = one per CPU, 0 = hash in this process)
+    limit: stop after this many records in this run (the checkpoint keeps the rest)
+    """
+    checkpoint = Checkpoint(path, restart)
+    done = checkpoint.state['records']
+    inserted = checkpoint.state['inserted']
+    rejected = checkpoint.state['rejected']
+    if done:
+        report(f"↪️  Resuming after record {done} ({inserted} inserted, {rejected} rejected so far)")
+
+    records = islice(read_records(path, file_format), done, None)
+    if limit is not None:
+        records = islice(records, limit)
+
+    executor = ProcessPoolExecutor(workers) if workers != 0 else None
+    locations = set()
+    seen_emails = set()
+    started = time.perf_counter()
+    processed = 0
+    finished = False
+    try:
+        with app.app_context(), open(path + '.rejects.jsonl', 'a', encoding='utf-8') as rejects:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                rows, batch_rejected = import_batch(batch, executor, seen_emails, rejects, done + 1)
+                rejects.flush()
+                done += len(batch)
+                processed += len(batch)
+                inserted += len(rows)
+                rejected += batch_rejected
+                checkpoint.save(done, inserted, rejected)
+
+                for row in rows:
+                    if geocode and not row['geocoded']:
+                        # One geocode job per distinct location, however many donors share it
+                        if row['location'] not in locations:
+                            locations.add(row['location'])
+                            geocode_queue.enqueue('donor_location', row['location'])
+
+                elapsed = time.perf_counter() - started
+                report(f"📥 {done} records: {inserted} inserted, {rejected} rejected "
+                       f"({processed / elapsed:.0f} records/s)")
+            finished = limit is None or processed < limit
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    if finished:
+        checkpoint.clear()
+    if geocode and locations:
+        report(f"🌍 Geocoding {len(locations)} distinct locations (rate limited)...")
+        geocode_queue.join()
+    return {
+        'records': done,
+        'inserted': inserted,
+        'rejected': rejected,
+        'seconds': elapsed,
+        'records_per_second': processed / elapsed if elapsed else 0.0,
+        'locations_queued': len(locations),
+        'finished': finished,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import donors from CSV or JSONL')
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None, help='password hashing processes (default: CPUs)')
+    parser.add_argument('--limit', type=int, default=None, help='import at most N records in this run')
+    parser.add_argument('--skip-geocode', action='store_true', help='leave geocoding to the backfill/search')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    summary = import_file(args.file, args.format, args.batch_size, args.workers, args.limit,
+                          geocode=not args.skip_geocode, restart=args.restart)
+    print("=" * 60)
+    print(f"✅ {summary['inserted']} donors imported, {summary['rejected']} rejected "
+          f"of {summary['records']} records in {summary['seconds']:.1f}s "
+          f"({summary['records_per_second']:.0f} records/s)")
+    if summary['rejected']:
+        print(f"   Rejected records: {args.file}.rejects.jsonl")
+    if not summary['finished']:
+        print(f"   Stopped early; run again to resume from {args.file}.checkpoint")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
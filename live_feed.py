@@ -0,0 +1,155 @@
+"""
+Live dashboard feed (Server-Sent Events)
+
+Write paths publish small events into an event table in the same
+transaction as the change, each addressed to one user as (audience,
+user_id): a request newly matched to a donor, a donor's response for the
+receiver, the receiver's decision for the donor, a request closed. The
+/events endpoint streams a user's events after a given id as
+text/event-stream, so a dashboard updates in place instead of reloading,
+and a reconnecting browser resumes from Last-Event-ID without losing
+events.
+
+Streams poll the (audience, user_id, id) index. Commits in the same
+process wake them straight away; commits in other processes (other web
+workers, import/migration scripts) are seen within the poll interval.
+Each stream ends after max_seconds so it does not hold a server thread
+for ever; EventSource reconnects by itself after the retry delay. The
+Flask route long-polls: it ends as soon as it has sent events, or after
+a couple of idle seconds.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+
+# Events read per poll
+POLL_BATCH = 100
+
+
+def sse_message(event_id, event_type, data):
+    """One SSE message; data is a JSON string without newlines"""
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+
+
+class LiveFeed:
+    """
+    Publish and stream per-user events kept in an event table
+    """
+
+    def __init__(self, table, retention_hours=24):
+        self.table = table
+        self.retention_hours = retention_hours
+        self._condition = threading.Condition()
+        self._version = 0
+        # Set by publish, cleared by the session's commit/rollback (per thread)
+        self._local = threading.local()
+        self._next_purge = 0.0
+
+    def install(self, session):
+        """Wake this process's streams when a session commits published events"""
+        event.listen(session, 'after_commit', self._after_commit)
+        event.listen(session, 'after_rollback', self._after_rollback)
+
+    def _after_commit(self, session):
+        if getattr(self._local, 'published', False):
+            self._local.published = False
+            self.notify()
+
+    def _after_rollback(self, session):
+        self._local.published = False
+
+    def notify(self):
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until notify() after `version` or timeout, returns the current version"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def publish(self, conn, events):
+        """
+        Insert events (dicts with audience, user_id, type and a JSON-able
+        data dict) in the caller's transaction
+        """
+        if not events:
+            return 0
+        now = datetime.now()
+        conn.execute(self.table.insert(), [
+            {'audience': e['audience'], 'user_id': e['user_id'], 'type': e['type'],
+             'data': json.dumps(e['data'], default=str), 'created_at': now}
+            for e in events
+        ])
+        self._local.published = True
+        return len(events)
+
+    def latest_id(self, conn, audience, user_id):
+        """Id of the user's newest event (0 if none); a page rendered now streams from here"""
+        table = self.table
+        return conn.execute(
+            select(func.max(table.c.id)).where(table.c.audience == audience, table.c.user_id == user_id)
+        ).scalar() or 0
+
+    def since(self, conn, audience, user_id, after_id, limit=POLL_BATCH):
+        """The user's events after `after_id`, oldest first"""
+        table = self.table
+        return conn.execute(
+            select(table.c.id, table.c.type, table.c.data)
+            .where(table.c.audience == audience, table.c.user_id == user_id, table.c.id > after_id)
+            .order_by(table.c.id)
+            .limit(limit)
+        ).all()
+
+    def purge(self, conn, now=None):
+        """Delete events older than the retention period, returns how many"""
+        cutoff = (now or datetime.now()) - timedelta(hours=self.retention_hours)
+        return conn.execute(self.table.delete().where(self.table.c.created_at < cutoff)).rowcount
+
+    def purge_due(self, interval=3600):
+        """True at most once per interval seconds in this process"""
+        with self._condition:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return False
+            self._next_purge = now + interval
+            return True
+
+    def stream(self, engine, audience, user_id, after_id, poll_interval=2.0, max_seconds=60,
+               heartbeat_seconds=15, retry_ms=2000, until_events=False):
+        """
+        Generator of SSE text for the user's events after `after_id`
+        A connection is only checked out while polling, never while waiting
+        until_events: end as soon as events were sent (long polling)
+        """
+        yield f'retry: {retry_ms}\n\n'
+        started = time.monotonic()
+        deadline = started + max_seconds
+        last_write = started
+        while True:
+            # Read the version first so a commit during the poll still wakes us
+            version = self._version
+            with engine.connect() as conn:
+                rows = self.since(conn, audience, user_id, after_id)
+            for row in rows:
+                after_id = row.id
+                yield sse_message(row.id, row.type, row.data)
+            now = time.monotonic()
+            if rows:
+                last_write = now
+                if len(rows) == POLL_BATCH:
+                    continue
+                if until_events:
+                    return
+            elif now - last_write >= heartbeat_seconds:
+                # Comment line: keeps proxies from closing an idle stream
+                last_write = now
+                yield ': keep-alive\n\n'
+            if now >= deadline:
+                return
+            self.wait(version, min(poll_interval, deadline - now))
@@ -0,0 +1,63 @@
+"""
+Ranking of donors for a blood request
+
+A request is matched once, when it is created (and again when a donor's
+availability, blood group or coordinates change), instead of every donor
+dashboard view scanning all active requests. A donor matches a request
+when their blood group is compatible, they are available, they have not
+donated too recently, and they are within the match radius of the
+hospital. Requests whose hospital could not be geocoded match compatible
+donors anywhere, and donors without coordinates only match those.
+
+Matches are ranked by a score in [0, 1]: mostly distance, partly how long
+ago the donor last donated (donors who never donated count as fully
+rested). The app stores the top ones in the request_match table.
+"""
+
+from datetime import timedelta
+
+# Share of the score given to distance; the rest goes to time since last donation
+DISTANCE_WEIGHT = 0.7
+# Time since the last donation after which a donor counts as fully rested
+RESTED_DAYS = 365
+
+
+def rest_score(last_donation, now):
+    """1.0 for donors who never donated or donated RESTED_DAYS ago, 0.0 for today"""
+    if last_donation is None:
+        return 1.0
+    days = (now - last_donation).total_seconds() / 86400
+    return min(max(days / RESTED_DAYS, 0.0), 1.0)
+
+
+def match_score(distance_km, radius_km, last_donation, now):
+    """
+    Rank of one donor for one request, higher is better
+    A donor with unknown distance gets the distance share of a donor at the
+    edge of the radius
+    """
+    if distance_km is None or not radius_km:
+        closeness = 0.0
+    else:
+        closeness = max(0.0, 1.0 - distance_km / radius_km)
+    return round(DISTANCE_WEIGHT * closeness + (1 - DISTANCE_WEIGHT) * rest_score(last_donation, now), 6)
+
+
+def rank_donors(candidates, last_donations, radius_km, now, min_gap_days, limit=None):
+    """
+    Rank candidate donors for a request
+    candidates: iterable of (donor_id, distance_km or None)
+    last_donations: {donor_id: datetime of their latest donation}
+    Donors who donated within min_gap_days are left out (they cannot donate yet)
+    Returns [(donor_id, distance_km, score)] best first, at most limit long
+    """
+    eligible_before = now - timedelta(days=min_gap_days)
+    ranked = []
+    for donor_id, distance_km in candidates:
+        last_donation = last_donations.get(donor_id)
+        if last_donation is not None and last_donation > eligible_before:
+            continue
+        ranked.append((donor_id, distance_km, match_score(distance_km, radius_km, last_donation, now)))
+    # Best score first; ties go to the nearer donor, then the lower id
+    ranked.sort(key=lambda match: (-match[2], match[1] if match[1] is not None else float('inf'), match[0]))
+    return ranked[:limit] if limit is not None else ranked
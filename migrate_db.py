@@ -1,37 +1,33 @@
-import sqlite3
-from datetime import datetime
+from sqlalchemy import inspect, text
 
-# Connect to database
-conn = sqlite3.connect('instance/blood_finder.db')
-cursor = conn.cursor()
+from app import app, db
 
-print("Adding new columns to blood_request table...")
+# Goes through the app's engine (DATABASE_URL), so it works on any backend
+with app.app_context():
+    print("Adding new columns to blood_request table...")
 
-try:
-    # Add the new columns to the existing table
-    cursor.execute('ALTER TABLE blood_request ADD COLUMN requesting_for TEXT DEFAULT "myself"')
-    cursor.execute('ALTER TABLE blood_request ADD COLUMN patient_name TEXT')
-    cursor.execute('ALTER TABLE blood_request ADD COLUMN patient_relation TEXT')
-    
-    # Update existing records to have requesting_for = 'myself'
-    cursor.execute('UPDATE blood_request SET requesting_for = "myself" WHERE requesting_for IS NULL')
-    
-    conn.commit()
-    print("✅ Successfully added new columns!")
-    print("✅ Updated existing records to 'myself'")
-    
-except sqlite3.OperationalError as e:
-    if "duplicate column name" in str(e):
+    columns = [column['name'] for column in inspect(db.engine).get_columns('blood_request')]
+    if 'requesting_for' in columns:
         print("ℹ️ Columns already exist, no migration needed.")
     else:
-        print(f"❌ Error: {e}")
+        try:
+            with db.engine.begin() as conn:
+                # Add the new columns to the existing table
+                conn.execute(text("ALTER TABLE blood_request ADD COLUMN requesting_for VARCHAR(20) DEFAULT 'myself'"))
+                conn.execute(text("ALTER TABLE blood_request ADD COLUMN patient_name VARCHAR(100)"))
+                conn.execute(text("ALTER TABLE blood_request ADD COLUMN patient_relation VARCHAR(50)"))
+                
+                # Update existing records to have requesting_for = 'myself'
+                conn.execute(text("UPDATE blood_request SET requesting_for = 'myself' WHERE requesting_for IS NULL"))
+            
+            print("✅ Successfully added new columns!")
+            print("✅ Updated existing records to 'myself'")
+        except Exception as e:
+            print(f"❌ Error: {e}")
 
-# Show the updated table structure
-print("\n=== Updated Table Structure ===")
-cursor.execute("PRAGMA table_info(blood_request)")
-columns = cursor.fetchall()
-for col in columns:
-    print(f"- {col[1]} ({col[2]})")
+    # Show the updated table structure
+    print("\n=== Updated Table Structure ===")
+    for col in inspect(db.engine).get_columns('blood_request'):
+        print(f"- {col['name']} ({col['type']})")
 
-conn.close()
-print("\nDatabase migration completed!")
\ No newline at end of file
+print("\nDatabase migration completed!")
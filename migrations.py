@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for existing databases
+
+Each migration runs once, in order; the applied version is kept in the
+schema_version table. Tables that do not exist yet are first created from
+the current models, so every step is idempotent: running this against a
+database created by create_db.py (which already has the latest schema) only
+records the version.
+
+There are two kinds of steps:
+
+- Schema changes (steps 1, 2, 4, 5) run their own fixed DDL and SQL. A
+  released one is never edited; a change to the schema gets a new
+  migration version.
+- Data backfills (steps 3, 6, and the grid cells of step 1) fill derived
+  data (stat counters, request_match, donor.grid_cell) by running the
+  application's current logic, exactly like rebuild_stats.py or a new
+  request would. They are not frozen: on an old database they produce
+  what today's code would, which is the point of derived data, and a
+  change to that logic does not need a migration.
+
+After migrating, active requests left without matches are matched again
+(match_unmatched_requests), once per deployment.
+
+Usage: python migrations.py
+"""
+
+from sqlalchemy import inspect, text
+
+from app import app, db, stats_tracker, match_request, match_unmatched_requests
+from postgis import add_geography_column
+from spatial_index import grid_cell
+
+# Indexes matching the hot queries in app.py, as declared on the models when
+# this set was released: (name, table, columns). A new index set gets a new
+# migration version; never edit a released one.
+INDEX_SET_V1 = [
+    ('ix_donor_availability_blood_group', 'donor', ('availability', 'blood_group')),
+    ('ix_donation_history_donor_date', 'donation_history', ('donor_id', 'donation_date')),
+    ('ix_blood_request_status_group_urgency', 'blood_request',
+     ('status', 'blood_group_needed', 'urgency', 'needed_by_date')),
+    ('ix_blood_request_receiver_date', 'blood_request', ('receiver_id', 'request_date')),
+    ('ix_donation_response_request_donor', 'donation_response', ('request_id', 'donor_id')),
+    ('ix_donation_response_donor_date', 'donation_response', ('donor_id', 'response_date')),
+    ('ix_donation_response_donor_status', 'donation_response', ('donor_id', 'status')),
+]
+
+
+def add_donor_grid_cell(conn):
+    """Add donor.grid_cell spatial index column and backfill it"""
+    columns = [column['name'] for column in inspect(conn).get_columns('donor')]
+    if 'grid_cell' not in columns:
+        conn.execute(text("ALTER TABLE donor ADD COLUMN grid_cell INTEGER"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_donor_grid_cell ON donor (grid_cell)"))
+
+    rows = conn.execute(text(
+        "SELECT id, latitude, longitude FROM donor WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).fetchall()
+    for donor_id, latitude, longitude in rows:
+        conn.execute(
+            text("UPDATE donor SET grid_cell = :cell WHERE id = :id"),
+            {'cell': grid_cell(latitude, longitude), 'id': donor_id}
+        )
+
+
+def create_index_set(indexes):
+    def migrate(conn):
+        for name, table, columns in indexes:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+    migrate.__doc__ = f"Create indexes: {', '.join(name for name, _, _ in indexes)}"
+    return migrate
+
+
+def rebuild_stats(conn):
+    """Fill the stat table from existing rows (data backfill, current stats.py counters)"""
+    stats_tracker.rebuild(conn, db.metadata)
+
+
+def add_request_columns(conn):
+    """Add blood_request hospital latitude/longitude and direct_donor_id columns"""
+    columns = [column['name'] for column in inspect(conn).get_columns('blood_request')]
+    for column in ('latitude', 'longitude'):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE blood_request ADD COLUMN {column} FLOAT"))
+    if 'direct_donor_id' not in columns:
+        conn.execute(text("ALTER TABLE blood_request ADD COLUMN direct_donor_id INTEGER REFERENCES donor (id)"))
+        # Earlier direct requests are only recognisable by the note
+        # send_request_to_donor appends; their donor got the first response
+        conn.execute(text(
+            "UPDATE blood_request SET direct_donor_id = ("
+            "SELECT donor_id FROM donation_response WHERE donation_response.request_id = blood_request.id "
+            "ORDER BY donation_response.id LIMIT 1"
+            ") WHERE additional_notes LIKE '%[Direct request sent to: %'"
+        ))
+
+
+def match_active_requests(conn):
+    """Match donors to active requests, except direct requests (data backfill, current match_request)"""
+    request_ids = conn.execute(text(
+        "SELECT id FROM blood_request WHERE status = 'Active' AND direct_donor_id IS NULL"
+    )).scalars().all()
+    for request_id in request_ids:
+        match_request(conn, request_id)
+
+
+MIGRATIONS = [
+    (1, add_donor_grid_cell),
+    (2, create_index_set(INDEX_SET_V1)),
+    (3, rebuild_stats),
+    (4, add_geography_column),
+    (5, add_request_columns),
+    (6, match_active_requests),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def upgrade():
+    """Apply all pending migrations, returns the resulting schema version"""
+    with app.app_context():
+        # Tables that do not exist yet are created with the latest schema
+        db.create_all()
+        with db.engine.begin() as conn:
+            version = current_version(conn)
+            for target, migrate in MIGRATIONS:
+                if target <= version:
+                    continue
+                print(f"⬆️  Migration {target}: {migrate.__doc__}")
+                migrate(conn)
+                conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {'v': target})
+                version = target
+        print(f"✅ Database schema at version {version}")
+        return version
+
+
+if __name__ == "__main__":
+    upgrade()
+    # Deployment step (run.py runs this script before serving), so it
+    # happens once rather than in every worker process
+    with app.app_context():
+        matched = match_unmatched_requests()
+    if matched:
+        print(f"🔁 {matched} active requests without matches matched again")
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+
+
+def expanding_ring_search(snapshot, lat, lon, k, blood_groups=None,
+                          start_radius_km=5, max_radius_km=200):
+    """
+    Find the k nearest matching donors, growing the search radius until
+    k are found or max_radius_km is reached
+    Each ring is a partial top-k selection over the in-memory snapshot
+    Returns (matches, radius_km) with matches as (donor_id, distance_km)
+    """
+    radius = start_radius_km
+    while True:
+        matches = snapshot.query(lat, lon, radius, blood_groups=blood_groups, limit=k)
+        if len(matches) >= k or radius >= max_radius_km:
+            return matches, radius
+        radius = min(radius * 2, max_radius_km)
+
+
+def encode_cursor(lat, lon, blood_group, offset, distance_km):
+    """
+    Pagination cursor carrying the whole search, so any worker process can
+    serve the next page: the point, the blood group, how many results were
+    returned so far and the distance of the last one (where the next
+    page's search ring starts)
+    """
+    payload = json.dumps([lat, lon, blood_group, offset, distance_km], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    (lat, lon, blood_group, offset, distance_km) of a cursor
+    Raises ValueError for a malformed cursor or out of range values
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        lat, lon, blood_group, offset, distance_km = json.loads(payload)
+        lat, lon, offset, distance_km = float(lat), float(lon), int(offset), float(distance_km)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or offset < 0 or distance_km < 0 \
+            or not isinstance(blood_group, str):
+        raise ValueError('Invalid cursor')
+    return lat, lon, blood_group, offset, distance_km
@@ -0,0 +1,322 @@
+"""
+Notification outbox and batched dispatcher
+
+Messages are inserted into an outbox table in the same transaction as the
+change that causes them (a request being matched, a direct request), one
+row per donor, request and channel: a unique dedup key makes enqueueing
+the same alert twice a no-op. A separate dispatcher process
+(python dispatch_notifications.py) claims due messages per channel in
+batches, hands each batch to that channel's transport under a rate limit,
+and marks messages sent, or schedules a retry with exponential backoff
+until max_attempts.
+
+Claimed messages are leased: if the dispatcher dies mid-batch they become
+due again when the lease runs out, so delivery is at least once.
+
+Transports: FileTransport (local stand-in, one JSON line per message),
+SMTPTransport (email, one connection per batch; works against a local
+debugging SMTP server) and WebhookTransport (one JSON POST per batch, e.g.
+an SMS gateway).
+"""
+
+import json
+import os
+import smtplib
+import threading
+import urllib.request
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from geocode_queue import RateLimiter
+from sqlite_tuning import write_transactions
+
+CHANNELS = ('email', 'sms')
+
+# INSERT ... ON CONFLICT DO NOTHING per dialect; others check first
+INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def dedup_key(channel, donor_id, request_id):
+    return f'{channel}:donor-{donor_id}:request-{request_id}'
+
+
+class FileTransport:
+    """Appends messages as JSON lines to a file (offline stand-in)"""
+
+    def __init__(self, path, batch_size=500, rate=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.rate = rate
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps({
+                'id': message.id, 'channel': message.channel, 'recipient': message.recipient,
+                'subject': message.subject, 'body': message.body, 'sent_at': datetime.now().isoformat(),
+            }) + '\n' for message in messages))
+        return {}
+
+
+class SMTPTransport:
+    """Sends a batch of emails over one SMTP connection"""
+
+    def __init__(self, host, port, sender, batch_size=50, rate=None, username=None, password=None, starttls=False):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.batch_size = batch_size
+        self.rate = rate
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def send(self, messages):
+        failures = {}
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message in messages:
+                email = EmailMessage()
+                email['From'] = self.sender
+                email['To'] = message.recipient
+                email['Subject'] = message.subject
+                email.set_content(message.body)
+                try:
+                    smtp.send_message(email)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    # Only this message failed; the connection is still usable
+                    failures[message.id] = str(e)
+        return failures
+
+
+class WebhookTransport:
+    """POSTs a batch as {"messages": [...]}; a non-2xx answer fails the batch"""
+
+    def __init__(self, url, batch_size=100, rate=None, timeout=30):
+        self.url = url
+        self.batch_size = batch_size
+        self.rate = rate
+        self.timeout = timeout
+
+    def send(self, messages):
+        payload = json.dumps({'messages': [
+            {'id': message.id, 'channel': message.channel, 'to': message.recipient,
+             'subject': message.subject, 'body': message.body}
+            for message in messages
+        ]}).encode()
+        request = urllib.request.Request(self.url, data=payload, headers={'Content-Type': 'application/json'})
+        # urlopen raises HTTPError for non-2xx answers
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+        return {}
+
+
+def build_transports(config, instance_path):
+    """
+    {channel: transport} from NOTIFY_* settings
+    Every channel defaults to a FileTransport under instance/notifications/
+    """
+    transports = {}
+    for channel in CHANNELS:
+        kind = config[f'NOTIFY_{channel.upper()}_TRANSPORT']
+        rate = config[f'NOTIFY_{channel.upper()}_RATE'] or None
+        if kind == 'smtp':
+            transports[channel] = SMTPTransport(
+                config['NOTIFY_SMTP_HOST'], config['NOTIFY_SMTP_PORT'], config['NOTIFY_SMTP_SENDER'], rate=rate,
+                username=config['NOTIFY_SMTP_USERNAME'], password=config['NOTIFY_SMTP_PASSWORD'],
+                starttls=config['NOTIFY_SMTP_STARTTLS']
+            )
+        elif kind == 'webhook':
+            transports[channel] = WebhookTransport(config[f'NOTIFY_{channel.upper()}_WEBHOOK_URL'], rate=rate)
+        elif kind == 'file':
+            transports[channel] = FileTransport(os.path.join(instance_path, 'notifications', f'{channel}.jsonl'),
+                                                rate=rate)
+        else:
+            raise ValueError(f'Unknown {channel} transport "{kind}"')
+    return transports
+
+
+class Outbox:
+    """
+    Enqueue, claim and complete messages in a notification outbox table
+    donor_id/request_id reference the donor and request a message is
+    about; call forget() before deleting either
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def enqueue(self, conn, messages):
+        """
+        Insert messages (dicts with dedup_key, channel, recipient, subject,
+        body and optionally donor_id/request_id); duplicates are skipped
+        Returns the number of new messages
+        """
+        if not messages:
+            return 0
+        now = datetime.now()
+        rows = [dict(message, status='Pending', attempts=0, created_at=now, next_attempt_at=now)
+                for message in messages]
+        insert = INSERTS.get(conn.dialect.name)
+        if insert is not None:
+            result = conn.execute(insert(self.table).on_conflict_do_nothing(index_elements=['dedup_key']), rows)
+            return result.rowcount
+        existing = set(conn.execute(
+            select(self.table.c.dedup_key).where(self.table.c.dedup_key.in_([row['dedup_key'] for row in rows]))
+        ).scalars())
+        rows = [row for row in rows if row['dedup_key'] not in existing]
+        if rows:
+            conn.execute(self.table.insert(), rows)
+        return len(rows)
+
+    def forget(self, conn, request_ids=(), donor_ids=()):
+        """
+        Before requests or donors are deleted: drop their messages not sent
+        yet and unlink the others, which stay as a log of what was sent
+        Returns the number of messages dropped
+        """
+        table = self.table
+        request_ids, donor_ids = list(request_ids), list(donor_ids)
+        concerned = (table.c.request_id.in_(request_ids)) | (table.c.donor_id.in_(donor_ids))
+        dropped = conn.execute(
+            table.delete().where(concerned, table.c.status.in_(['Pending', 'Sending']))
+        ).rowcount
+        if request_ids:
+            conn.execute(table.update().where(table.c.request_id.in_(request_ids)).values(request_id=None))
+        if donor_ids:
+            conn.execute(table.update().where(table.c.donor_id.in_(donor_ids)).values(donor_id=None))
+        return dropped
+
+    def claim(self, conn, channel, limit, lease_seconds, now=None):
+        """
+        Lease up to `limit` due messages of a channel, oldest first
+        On PostgreSQL rows locked by another dispatcher are skipped; on
+        SQLite run a single dispatcher
+        """
+        now = now or datetime.now()
+        table = self.table
+        messages = conn.execute(
+            select(table.c.id, table.c.channel, table.c.recipient, table.c.subject, table.c.body, table.c.attempts)
+            .where(table.c.channel == channel, table.c.status.in_(['Pending', 'Sending']),
+                   table.c.next_attempt_at <= now)
+            .order_by(table.c.next_attempt_at, table.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if messages:
+            conn.execute(
+                table.update().where(table.c.id.in_([message.id for message in messages]))
+                .values(status='Sending', next_attempt_at=now + timedelta(seconds=lease_seconds))
+            )
+        return messages
+
+    def complete(self, conn, messages, failures, max_attempts, backoff_seconds, now=None):
+        """
+        Mark a sent batch: failed messages ({id: error}) are retried after
+        backoff_seconds * 2 ** (attempts - 1), or given up after max_attempts
+        Returns (sent, retried, given_up)
+        """
+        now = now or datetime.now()
+        table = self.table
+        sent = [message.id for message in messages if message.id not in failures]
+        if sent:
+            conn.execute(table.update().where(table.c.id.in_(sent))
+                         .values(status='Sent', sent_at=now, attempts=table.c.attempts + 1, last_error=None))
+        retried = given_up = 0
+        for message in messages:
+            if message.id not in failures:
+                continue
+            attempts = message.attempts + 1
+            values = {'attempts': attempts, 'last_error': str(failures[message.id])[:500]}
+            if attempts >= max_attempts:
+                values['status'] = 'Failed'
+                given_up += 1
+            else:
+                values['status'] = 'Pending'
+                values['next_attempt_at'] = now + timedelta(seconds=backoff_seconds * 2 ** (attempts - 1))
+                retried += 1
+            conn.execute(table.update().where(table.c.id == message.id).values(**values))
+        return len(sent), retried, given_up
+
+    def counts(self, conn):
+        """{(channel, status): number of messages}"""
+        rows = conn.execute(
+            select(self.table.c.channel, self.table.c.status, func.count(self.table.c.id))
+            .group_by(self.table.c.channel, self.table.c.status)
+        )
+        return {(channel, status): count for channel, status, count in rows}
+
+
+class Dispatcher:
+    """
+    Drains the outbox: per channel, claim a batch, wait for the rate
+    limit, send, record the outcome
+    """
+
+    def __init__(self, engine, outbox, transports, max_attempts=5, backoff_seconds=30, lease_seconds=300):
+        self.engine = engine
+        self.outbox = outbox
+        self.transports = transports
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        # rate is messages per second; None means unlimited
+        self.limiters = {channel: RateLimiter(1.0 / transport.rate)
+                         for channel, transport in transports.items() if transport.rate}
+        # A batch goes out at once, so a rate limited one holds at most a
+        # second's worth of messages
+        self.batch_sizes = {channel: max(1, min(transport.batch_size, int(transport.rate)))
+                            if transport.rate else transport.batch_size
+                            for channel, transport in transports.items()}
+        self.totals = {'sent': 0, 'retried': 0, 'failed': 0}
+
+    def dispatch_batch(self, channel):
+        """Send one batch of a channel, returns the number of messages handled"""
+        transport = self.transports[channel]
+        # A claim reads, then writes (see sqlite_tuning.py)
+        with write_transactions(), self.engine.begin() as conn:
+            messages = self.outbox.claim(conn, channel, self.batch_sizes[channel], self.lease_seconds)
+        if not messages:
+            return 0
+
+        limiter = self.limiters.get(channel)
+        if limiter is not None:
+            limiter.wait(len(messages))
+        try:
+            failures = transport.send(messages)
+        except Exception as e:
+            # Connection/gateway errors fail the whole batch
+            failures = {message.id: f'{type(e).__name__}: {e}' for message in messages}
+
+        with self.engine.begin() as conn:
+            sent, retried, given_up = self.outbox.complete(
+                conn, messages, failures, self.max_attempts, self.backoff_seconds
+            )
+        self.totals['sent'] += sent
+        self.totals['retried'] += retried
+        self.totals['failed'] += given_up
+        return len(messages)
+
+    def run_once(self):
+        """Send every message that is due now, returns how many were handled"""
+        handled = 0
+        while True:
+            batch = sum(self.dispatch_batch(channel) for channel in self.transports)
+            if not batch:
+                return handled
+            handled += batch
+
+    def run(self, poll_interval=5.0, stop=None):
+        """Keep draining the outbox until `stop` (a threading.Event) is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(poll_interval)
@@ -0,0 +1,53 @@
+import base64
+import json
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last row on a page as an opaque URL-safe string
+    """
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor, returns None if it is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    return values if isinstance(values, list) and len(values) == 2 else None
+
+
+def keyset_page(query, sort_column, id_column, descending=False, after=None, per_page=25):
+    """
+    Fetch one page of a query using keyset (seek) pagination
+    Rows are ordered by (sort_column, id_column), so ties on the sort column
+    are stable; `after` is the cursor of the previous page's last row.
+    Unlike OFFSET, the cost of a page does not grow with its position.
+    Returns (rows, next_cursor); next_cursor is None on the last page
+    """
+    key = tuple_(sort_column, id_column)
+    position = decode_cursor(after)
+    if position is not None:
+        query = query.filter(key < tuple(position) if descending else key > tuple(position))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Fetch one extra row to learn whether there is a next page
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, sort_column.key), getattr(last, id_column.key)])
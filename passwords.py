@@ -0,0 +1,51 @@
+"""
+Password hashing policy
+
+The policy is a werkzeug hash method string with its work factor, e.g.
+'scrypt' (werkzeug's default, scrypt:32768:8:1), 'scrypt:16384:8:1' or
+'pbkdf2:sha256:600000'. Stored hashes record the method they were made
+with, so a hash made under a different policy (stronger or weaker) is
+detected at login and replaced. Use bench_passwords.py to see what each
+policy costs per login.
+"""
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def _hash_with(method_and_password):
+    # Module level so process pools can pickle it; '' stays '' (no login)
+    method, password = method_and_password
+    return generate_password_hash(password, method) if password else ''
+
+
+class PasswordPolicy:
+    def __init__(self, method='scrypt'):
+        # Hash once to learn the full method string werkzeug records, so
+        # 'scrypt' and 'scrypt:32768:8:1' compare equal
+        self.method = generate_password_hash('', method).split('$', 1)[0]
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def hash_many(self, passwords, executor=None):
+        """
+        Hash a batch of passwords, spread over a process pool if given
+        Empty passwords give '' (an account that cannot log in)
+        """
+        items = [(self.method, password) for password in passwords]
+        if executor is None:
+            return [_hash_with(item) for item in items]
+        return list(executor.map(_hash_with, items, chunksize=max(1, len(items) // 32)))
+
+    def verify(self, stored, password):
+        if not stored:
+            return False
+        try:
+            return check_password_hash(stored, password)
+        except ValueError:
+            # Unknown or malformed hash method
+            return False
+
+    def needs_rehash(self, stored):
+        """True if stored was made under a different method or work factor"""
+        return stored.split('$', 1)[0] != self.method
@@ -0,0 +1,91 @@
+"""
+PostGIS radius search for PostgreSQL deployments
+
+On PostgreSQL with the PostGIS extension, donor.geog is a geography point
+generated from latitude/longitude (so every write path keeps it current
+without app changes) with a GiST index. PostGISDonorIndex answers the same
+radius query as the in-memory DonorSnapshot, but in the database with
+ST_DWithin and index-assisted nearest-first ordering, so every node sees
+the same, current data.
+
+On SQLite (or PostgreSQL without PostGIS) none of this is installed and
+the app keeps using the Python path (donor snapshot / bounding box).
+"""
+
+from sqlalchemy import bindparam, func, inspect, literal_column, select, text
+
+GEOGRAPHY_COLUMN = 'geog'
+
+
+def add_geography_column(conn):
+    """Add the PostGIS donor.geog column and GiST index (PostgreSQL only)"""
+    # Returns True if installed; skipped when PostGIS cannot be enabled
+    if conn.dialect.name != 'postgresql':
+        return False
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    except Exception as e:
+        savepoint.rollback()
+        print(f"ℹ️ PostGIS not available, radius search stays in Python: {e}")
+        return False
+    savepoint.commit()
+    conn.execute(text(
+        f"ALTER TABLE donor ADD COLUMN IF NOT EXISTS {GEOGRAPHY_COLUMN} geography(Point, 4326) "
+        "GENERATED ALWAYS AS (CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL "
+        "THEN ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography END) STORED"
+    ))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_donor_{GEOGRAPHY_COLUMN} ON donor USING GIST ({GEOGRAPHY_COLUMN})"))
+    return True
+
+
+def postgis_available(conn):
+    """True if this database has the donor.geog column"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return GEOGRAPHY_COLUMN in [column['name'] for column in inspect(conn).get_columns('donor')]
+
+
+class PostGISDonorIndex:
+    """
+    Radius search over available donors in PostGIS
+    Same query() interface as DonorSnapshot
+    """
+
+    def __init__(self, session, donor_table):
+        self.session = session
+        self.donor = donor_table
+        self._available = None
+
+    def is_available(self):
+        # Checked once per process
+        if self._available is None:
+            self._available = postgis_available(self.session.connection())
+        return self._available
+
+    def statement(self, radius_km, blood_groups=None, limit=None):
+        donor = self.donor
+        geog = literal_column(f'{donor.name}.{GEOGRAPHY_COLUMN}')
+        point = func.ST_GeogFromText(bindparam('point'))
+        query = select(donor.c.id, (func.ST_Distance(geog, point) / 1000.0).label('distance_km')).where(
+            donor.c.availability == True,
+            func.ST_DWithin(geog, point, radius_km * 1000.0)
+        )
+        if blood_groups is not None:
+            query = query.where(donor.c.blood_group.in_(list(blood_groups)))
+        # <-> on geography is a GiST-assisted nearest-first scan
+        query = query.order_by(geog.op('<->')(point))
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def query(self, lat, lon, radius_km, blood_groups=None, limit=None):
+        """
+        Find available donors within radius_km of (lat, lon)
+        Returns a list of (donor_id, distance_km) nearest first, at most limit long
+        """
+        rows = self.session.execute(
+            self.statement(radius_km, blood_groups, limit),
+            {'point': f'SRID=4326;POINT({float(lon)} {float(lat)})'}
+        )
+        return [(donor_id, round(distance, 3)) for donor_id, distance in rows]
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Recompute the materialized dashboard counters (stat table) from the
+donor, receiver, blood_request and donation_response tables
+
+Counters are kept up to date by the app on every write; run this after
+editing the database outside the app, or if the counters look wrong.
+
+Usage: python rebuild_stats.py
+"""
+
+from app import app, db, rebuild_stats
+from stats import nested
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        totals = nested(rebuild_stats())
+    print("✅ Dashboard statistics rebuilt")
+    for section, values in totals.items():
+        print(f"   {section}: {values}")
@@ -1,5 +1,4 @@
-from app import app, db, Donor, Receiver, BloodRequest, DonationResponse, DonationHistory
-from werkzeug.security import generate_password_hash
+from app import app, db, Donor, Receiver, BloodRequest, DonationResponse, DonationHistory, password_policy
 
 def reset_to_original_credentials():
     """Reset all passwords back to 12345 and remove test users"""
@@ -36,7 +35,7 @@ def reset_to_original_credentials():
                 print(f"❌ Removed test receiver: {email}")
         
         # Reset original users passwords to 12345
-        original_password = generate_password_hash('12345')
+        original_password = password_policy.hash('12345')
         
         # Update Akash
         akash = Donor.query.filter_by(email='akash@gmail.com').first()
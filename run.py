@@ -1,5 +1,4 @@
-
-
+import importlib.util
 import subprocess
 import sys
 import os
@@ -9,40 +8,65 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
 DB_PATH = os.path.join(INSTANCE_DIR, 'blood_finder.db')
 CREATE_DB_PATH = os.path.join(BASE_DIR, 'create_db.py')
+MIGRATIONS_PATH = os.path.join(BASE_DIR, 'migrations.py')
 APP_PATH = os.path.join(BASE_DIR, 'app.py')
 
-# Path to the virtual environment's Python
-VENV_PYTHON = os.path.abspath(os.path.join(BASE_DIR, '..', '.venv', 'Scripts', 'python.exe'))
+# Serving: WEB_PROCESSES worker processes x WEB_THREADS threads each
+HOST = os.environ.get('HOST', '127.0.0.1')
+PORT = os.environ.get('PORT', '5000')
+WEB_PROCESSES = int(os.environ.get('WEB_PROCESSES', '1'))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '4'))
+
+
+def server_command():
+    """
+    Pick the best available server for the WSGI app in wsgi.py:
+    gunicorn (processes x threads, not on Windows), then waitress
+    (threads only), then Flask's development server
+    """
+    if os.name != 'nt' and importlib.util.find_spec('gunicorn'):
+        return 'gunicorn', [sys.executable, '-m', 'gunicorn', '--chdir', BASE_DIR,
+                            '--workers', str(WEB_PROCESSES), '--threads', str(WEB_THREADS),
+                            '--bind', f'{HOST}:{PORT}', 'wsgi:app']
+    if importlib.util.find_spec('waitress'):
+        if WEB_PROCESSES > 1:
+            print(f"[WARN] waitress serves from one process; WEB_PROCESSES={WEB_PROCESSES} ignored")
+        return 'waitress', [sys.executable, '-m', 'waitress', '--threads', str(WEB_THREADS),
+                            f'--listen={HOST}:{PORT}', 'wsgi:app']
+    print("[WARN] gunicorn/waitress not installed, using the Flask development server")
+    return 'Flask development server', [sys.executable, APP_PATH]
 
-# Relaunch with venv Python if not already using it
-if os.path.exists(VENV_PYTHON) and os.path.abspath(sys.executable) != VENV_PYTHON:
-    print(f"[INFO] Relaunching with virtual environment Python: {VENV_PYTHON}")
-    args = [VENV_PYTHON] + sys.argv
-    os.execv(VENV_PYTHON, args)
 
 # Step 1: Initialize database only if it doesn't exist
-if not os.path.exists(DB_PATH):
+# (with DATABASE_URL set, migrations create any missing tables)
+if 'DATABASE_URL' not in os.environ and not os.path.exists(DB_PATH):
     print("Creating new database...")
     try:
-        subprocess.run([sys.executable, CREATE_DB_PATH], check=True)
+        subprocess.run([sys.executable, CREATE_DB_PATH], check=True, cwd=BASE_DIR)
         print("Database created successfully!")
     except subprocess.CalledProcessError as e:
         print(f"Error creating database: {e}")
         sys.exit(1)
 else:
-    print("Database already exists, skipping creation...")
+    print("Applying pending database migrations...")
+    try:
+        subprocess.run([sys.executable, MIGRATIONS_PATH], check=True, cwd=BASE_DIR)
+    except subprocess.CalledProcessError as e:
+        print(f"Error migrating database: {e}")
+        sys.exit(1)
 
-# Step 2: Start the Flask app
+# Step 2: Start the app
+server, command = server_command()
 print("\n" + "="*50)
 print("🩸 BLOOD DONATION MANAGEMENT SYSTEM 🩸")
 print("="*50)
-print("Starting Flask development server...")
-print("The app will be available at: http://127.0.0.1:5000")
+print(f"Starting {server} ({WEB_PROCESSES} x {WEB_THREADS} threads)...")
+print(f"The app will be available at: http://{HOST}:{PORT}")
 print("Press Ctrl+C to stop the server")
 print("="*50 + "\n")
 
 try:
-    subprocess.run([sys.executable, APP_PATH])
+    subprocess.run(command, cwd=BASE_DIR)
 except KeyboardInterrupt:
     print("\n" + "="*50)
     print("Server stopped by user (Ctrl+C)")
@@ -0,0 +1,58 @@
+import math
+
+# Grid cells are CELL_SIZE degrees on a side (~11 km at the equator)
+CELL_SIZE = 0.1
+# Number of longitude cells in one latitude row (360 / CELL_SIZE)
+CELLS_PER_ROW = int(round(360 / CELL_SIZE))
+# Above this many rows the cell ranges stop paying off; use the bounding box alone
+MAX_CELL_ROWS = 64
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def grid_cell(lat, lon):
+    """
+    Map a coordinate to an integer grid cell id
+    Cells in the same latitude row are numbered consecutively by longitude,
+    so a row of cells is a single BETWEEN range on an indexed column
+    """
+    if lat is None or lon is None:
+        return None
+    row = int(math.floor((lat + 90) / CELL_SIZE))
+    col = int(math.floor((lon + 180) / CELL_SIZE)) % CELLS_PER_ROW
+    return row * CELLS_PER_ROW + col
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) enclosing a radius search
+    The box is slightly conservative so exact distances decide the edges
+    Searches crossing the antimeridian are not split (not needed for India)
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(-90.0, lat - lat_delta)
+    max_lat = min(90.0, lat + lat_delta)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    return min_lat, max_lat, max(-180.0, lon - lon_delta), min(180.0, lon + lon_delta)
+
+
+def cell_ranges(min_lat, max_lat, min_lon, max_lon):
+    """
+    Return a list of (low, high) grid cell ranges covering a bounding box,
+    one per latitude row, or None if the box covers too many rows
+    """
+    first_row = int(math.floor((min_lat + 90) / CELL_SIZE))
+    last_row = int(math.floor((max_lat + 90) / CELL_SIZE))
+    if last_row - first_row + 1 > MAX_CELL_ROWS:
+        return None
+
+    first_col = int(math.floor((min_lon + 180) / CELL_SIZE))
+    last_col = min(int(math.floor((max_lon + 180) / CELL_SIZE)), CELLS_PER_ROW - 1)
+    return [
+        (row * CELLS_PER_ROW + first_col, row * CELLS_PER_ROW + last_col)
+        for row in range(first_row, last_row + 1)
+    ]
@@ -0,0 +1,80 @@
+"""
+Per-connection SQLite settings for concurrent workers
+
+SQLite's defaults (rollback journal, FULL sync, small page cache) make
+every writer block all readers, and under several threads or processes
+requests fail with "database is locked". configure_engine() runs the
+configured PRAGMAs on every new connection of a SQLite engine:
+
+- journal_mode=WAL: readers no longer block on a writer (and vice versa)
+- busy_timeout: how long a writer waits for the lock before failing
+- synchronous=NORMAL: safe with WAL, no fsync on every commit
+- mmap_size / cache_size: read more pages from memory
+
+A transaction that reads first and writes later cannot wait for the write
+lock: if another writer got in between, SQLite fails it at once with
+"database is locked", whatever the busy_timeout. Transactions for which
+immediate() returns True, or that a thread begins inside a
+write_transactions() block (background writers, outside any request),
+start with BEGIN IMMEDIATE instead, taking the write lock up front (and
+waiting busy_timeout for it).
+
+Other database backends are left untouched.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+_writers = threading.local()
+
+
+@contextmanager
+def write_transactions():
+    """Transactions this thread begins inside the block will write"""
+    depth = getattr(_writers, 'depth', 0)
+    _writers.depth = depth + 1
+    try:
+        yield
+    finally:
+        _writers.depth = depth
+
+
+def in_write_transactions():
+    return getattr(_writers, 'depth', 0) > 0
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if value is not None:
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, pragmas, immediate=None):
+    """
+    Apply pragmas ({name: value}, None = leave the default) to every
+    connection the engine opens, if it is a SQLite engine
+    immediate: optional callable, True when the transaction about to
+    begin will write (besides those begun inside write_transactions())
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+        if immediate is not None:
+            # Let SQLAlchemy emit BEGIN itself instead of the sqlite3 module
+            dbapi_connection.isolation_level = None
+
+    if immediate is not None:
+        @event.listens_for(engine, 'begin')
+        def begin_transaction(conn):
+            conn.exec_driver_sql('BEGIN IMMEDIATE' if in_write_transactions() or immediate() else 'BEGIN')
+
+    return True
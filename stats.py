@@ -0,0 +1,234 @@
+"""
+Materialized dashboard statistics
+
+Counters (total donors, available donors per blood group, active requests
+per urgency, responses per status, ...) live in a small key/value table and
+are adjusted inside the same transaction as the writes that change them, so
+dashboards and monitors read a handful of rows instead of counting tables.
+
+Every tracked row contributes to a set of counter keys derived from a few of
+its columns; a write moves the row from its old key set to its new one.
+ORM inserts, updates and deletes are picked up at flush time; bulk
+Query.delete() calls and bulk session.execute(insert(Model), rows) just
+before they run. rebuild() recomputes everything
+from the source tables (python rebuild_stats.py).
+"""
+
+from collections import Counter
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from blood_compatibility import BLOOD_GROUPS
+
+
+def donor_keys(row):
+    keys = ['donors.total', f"donors.by_blood_group.{row['blood_group']}"]
+    if row['availability']:
+        keys += ['donors.available', f"donors.available_by_blood_group.{row['blood_group']}"]
+    return keys
+
+
+def receiver_keys(row):
+    return ['receivers.total']
+
+
+def request_keys(row):
+    keys = ['requests.total', f"requests.by_status.{row['status']}"]
+    if row['status'] == 'Active':
+        keys.append(f"requests.active_by_urgency.{row['urgency']}")
+    return keys
+
+
+def response_keys(row):
+    return ['responses.total', f"responses.by_status.{row['status']}"]
+
+
+# table name -> (columns the counters depend on, row -> counter keys)
+TRACKED = {
+    'donor': (('blood_group', 'availability'), donor_keys),
+    'receiver': ((), receiver_keys),
+    'blood_request': (('status', 'urgency'), request_keys),
+    'donation_response': (('status',), response_keys),
+}
+
+# INSERT ... ON CONFLICT DO UPDATE per dialect; others update, then insert
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Change markers kept in the same table (see donor_snapshot.SnapshotSync):
+# not counters, so rebuild() keeps them and read() leaves them out
+MARKER_KEYS = ('donors.version',)
+
+# Keys reported as 0 before anything has been counted
+BASE_KEYS = (
+    ['donors.total', 'donors.available', 'receivers.total', 'requests.total', 'responses.total']
+    + [f'donors.by_blood_group.{group}' for group in BLOOD_GROUPS]
+    + [f'donors.available_by_blood_group.{group}' for group in BLOOD_GROUPS]
+)
+
+
+def grouped_counts(conn, table, columns, whereclause=None):
+    """Yield ({column: value}, row count) for each distinct combination of columns"""
+    group = [table.c[column] for column in columns]
+    query = select(*group, func.count()).select_from(table)
+    if whereclause is not None:
+        query = query.where(whereclause)
+    if group:
+        query = query.group_by(*group)
+    for *values, count in conn.execute(query):
+        if count:
+            yield dict(zip(columns, values)), count
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+
+def _scalar_default(column):
+    # Python-side scalar default of a column, used for rows that omit it
+    default = column.default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+class StatsTracker:
+    """
+    Keeps a (key, value) stats table in step with ORM writes on a session
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def install(self, session, models):
+        for model in models:
+            columns, _ = TRACKED[model.__table__.name]
+            for column in columns:
+                # Load the previous value when an expired attribute is set,
+                # otherwise the flush cannot tell which counters it left
+                event.listen(getattr(model, column), 'set', _keep_history, active_history=True)
+        event.listen(session, 'before_flush', self._before_flush)
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'do_orm_execute', self._before_bulk_write)
+
+    # Flush hooks: old key sets are read before the flush (deleted rows still
+    # exist, defaults of new rows are not applied yet), new ones after it
+    def _before_flush(self, session, flush_context, instances):
+        delta = Counter()
+        for obj in session.deleted:
+            tracked = self._tracked(obj)
+            if tracked is not None:
+                columns, keys = tracked
+                delta.subtract(keys(self._old_values(obj, columns)))
+        for obj in session.dirty:
+            tracked = self._tracked(obj)
+            if tracked is not None:
+                columns, keys = tracked
+                delta.subtract(keys(self._old_values(obj, columns)))
+                delta.update(keys({column: getattr(obj, column) for column in columns}))
+        session.info['stats_delta'] = delta
+
+    def _after_flush(self, session, flush_context):
+        delta = session.info.pop('stats_delta', Counter())
+        for obj in session.new:
+            tracked = self._tracked(obj)
+            if tracked is not None:
+                columns, keys = tracked
+                delta.update(keys({column: getattr(obj, column) for column in columns}))
+        self.apply(session.connection(), delta)
+
+    def _before_bulk_write(self, orm_execute_state):
+        if not (orm_execute_state.is_delete or orm_execute_state.is_insert):
+            return
+        statement = orm_execute_state.statement
+        tracked = TRACKED.get(statement.table.name)
+        if tracked is None:
+            return
+        columns, keys = tracked
+        if orm_execute_state.is_insert:
+            self._count_bulk_insert(orm_execute_state, statement.table, columns, keys)
+            return
+        # Count the rows as the delete will see them, pending changes included
+        orm_execute_state.session.flush()
+        conn = orm_execute_state.session.connection()
+        delta = Counter()
+        for row, count in grouped_counts(conn, statement.table, columns, statement.whereclause):
+            for key in keys(row):
+                delta[key] -= count
+        self.apply(conn, delta)
+
+    def _count_bulk_insert(self, orm_execute_state, table, columns, keys):
+        rows = orm_execute_state.parameters
+        if isinstance(rows, dict):
+            rows = [rows]
+        defaults = {column: _scalar_default(table.c[column]) for column in columns}
+        delta = Counter()
+        for row in rows or []:
+            delta.update(keys({column: row.get(column, defaults[column]) for column in columns}))
+        self.apply(orm_execute_state.session.connection(), delta)
+
+    @staticmethod
+    def _tracked(obj):
+        table = getattr(obj, '__table__', None)
+        return TRACKED.get(table.name) if table is not None else None
+
+    @staticmethod
+    def _old_values(obj, columns):
+        attrs = inspect(obj).attrs
+        values = {}
+        for column in columns:
+            history = attrs[column].history
+            values[column] = history.deleted[0] if history.deleted else getattr(obj, column)
+        return values
+
+    def apply(self, conn, delta):
+        """Add a Counter of key -> change to the stats table"""
+        upsert = UPSERTS.get(conn.dialect.name)
+        for key, change in delta.items():
+            if not change:
+                continue
+            if upsert is not None:
+                # Atomic even when two transactions create the same key
+                conn.execute(upsert(self.table).values(key=key, value=change).on_conflict_do_update(
+                    index_elements=[self.table.c.key], set_={'value': self.table.c.value + change}
+                ))
+                continue
+            updated = conn.execute(
+                self.table.update().where(self.table.c.key == key).values(value=self.table.c.value + change)
+            )
+            if updated.rowcount == 0:
+                conn.execute(self.table.insert().values(key=key, value=change))
+
+    def rebuild(self, conn, metadata):
+        """Recompute every counter from the source tables"""
+        totals = Counter()
+        for name, (columns, keys) in TRACKED.items():
+            for row, count in grouped_counts(conn, metadata.tables[name], columns):
+                for key in keys(row):
+                    totals[key] += count
+
+        conn.execute(self.table.delete().where(self.table.c.key.not_in(MARKER_KEYS)))
+        if totals:
+            conn.execute(self.table.insert(), [{'key': key, 'value': value} for key, value in totals.items()])
+        return totals
+
+    def read(self, conn):
+        """All counters as a flat {key: value} dict"""
+        values = dict.fromkeys(BASE_KEYS, 0)
+        values.update(conn.execute(
+            select(self.table.c.key, self.table.c.value).where(self.table.c.key.not_in(MARKER_KEYS))
+        ).all())
+        return values
+
+
+def nested(values):
+    """
+    Turn flat dotted keys into nested dicts for JSON:
+    {'donors.by_blood_group.A+': 3} -> {'donors': {'by_blood_group': {'A+': 3}}}
+    """
+    result = {}
+    for key, value in sorted(values.items()):
+        *path, leaf = key.split('.')
+        node = result
+        for part in path:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return result
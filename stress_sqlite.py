@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test: many threads hammering read and write routes
+
+Usage: python stress_sqlite.py [--threads N] [--processes P] [--seconds S] [--baseline]
+
+Runs against a throwaway SQLite database seeded with donors, receivers and
+active requests. Every thread logs in as a random user and mixes dashboard
+reads with writes (toggle availability, respond to a request, create a
+request) through the Flask test client. Reports requests/sec, errors,
+"database is locked" failures and p50/p99 latency per route.
+
+--baseline uses SQLite's defaults (rollback journal, synchronous=FULL,
+deferred transactions) to compare with the tuned settings in app.py
+(SQLITE_* settings).
+"""
+
+import contextlib
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+DONORS = 200
+RECEIVERS = 20
+REQUESTS = 100
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+# Route name -> (role, method, path template, share of the traffic)
+OPERATIONS = [
+    ('donor dashboard', 'donor', 'GET', '/donor-dashboard', 25),
+    ('receiver dashboard', 'receiver', 'GET', '/receiver-dashboard', 20),
+    ('stats api', None, 'GET', '/api/stats', 15),
+    ('toggle availability', 'donor', 'POST', '/toggle-availability', 15),
+    ('respond to request', 'donor', 'POST', '/respond-to-request/{request_id}', 15),
+    ('create request', 'receiver', 'POST', '/create-request', 10),
+]
+
+BASELINE_ENV = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_SIZE': '-2000',
+    'SQLITE_IMMEDIATE_WRITES': '0',
+}
+
+
+def option(args, name, default):
+    if name in args:
+        return type(default)(args[args.index(name) + 1])
+    return default
+
+
+def seed():
+    from app import app, db, Donor, Receiver, BloodRequest
+    rng = random.Random(1)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            Donor(name=f'donor{i}', email=f'donor{i}@stress', password='x', age=30, gender='M',
+                  blood_group=rng.choice(BLOOD_GROUPS), location='Hubli', contact='1')
+            for i in range(DONORS)
+        )
+        receivers = [Receiver(name=f'receiver{i}', email=f'receiver{i}@stress', password='x',
+                              location='Hubli', contact='1') for i in range(RECEIVERS)]
+        db.session.add_all(receivers)
+        db.session.flush()
+        db.session.add_all(request_row(BloodRequest, rng.choice(receivers).id, rng) for _ in range(REQUESTS))
+        db.session.commit()
+
+
+def request_row(model, receiver_id, rng):
+    return model(
+        receiver_id=receiver_id, blood_group_needed=rng.choice(BLOOD_GROUPS), quantity_needed='1 unit',
+        urgency=rng.choice(['Critical', 'High', 'Normal', 'Low']), hospital_name='KIMS',
+        hospital_location='Hubli', needed_by_date=datetime.now() + timedelta(days=3),
+        contact_person='stress', contact_number='1'
+    )
+
+
+def request_form(rng):
+    return {
+        'requesting_for': 'myself', 'blood_group_needed': rng.choice(BLOOD_GROUPS),
+        'quantity_needed': '1 unit', 'urgency': 'High', 'hospital_name': 'KIMS',
+        'hospital_location': 'Hubli', 'contact_person': 'stress', 'contact_number': '1',
+        'needed_by_date': (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d'),
+    }
+
+
+def run_worker(threads, seconds, seed_value):
+    """Run threads against the app in this process, returns [(route, seconds, ok, locked)]"""
+    from flask import got_request_exception
+    from app import app
+
+    locked = threading.local()
+
+    def on_exception(sender, exception, **extra):
+        if 'database is locked' in str(exception):
+            locked.hit = True
+
+    got_request_exception.connect(on_exception, app)
+    names = [operation[0] for operation in OPERATIONS]
+    weights = [operation[4] for operation in OPERATIONS]
+    by_name = {operation[0]: operation for operation in OPERATIONS}
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def hammer(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = app.test_client()
+        samples = []
+        while time.monotonic() < deadline:
+            name, role, method, path, _ = by_name[rng.choices(names, weights)[0]]
+            if role:
+                with client.session_transaction() as sess:
+                    sess['role'] = role
+                    sess['user_id'] = rng.randint(1, DONORS if role == 'donor' else RECEIVERS)
+            url = path.format(request_id=rng.randint(1, REQUESTS))
+            data = request_form(rng) if name == 'create request' else {'action': 'accept'}
+            locked.hit = False
+            start = time.perf_counter()
+            response = client.open(url, method=method, data=data if method == 'POST' else None)
+            elapsed = time.perf_counter() - start
+            samples.append((name, elapsed, response.status_code < 500, locked.hit))
+        with results_lock:
+            results.extend(samples)
+
+    workers = [threading.Thread(target=hammer, args=(i,)) for i in range(threads)]
+    # Routes log every write with print(); keep the report readable
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return results
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(results, seconds, label):
+    print("=" * 86)
+    print(f"SQLite stress test: {label}")
+    print("=" * 86)
+    print(f"{'route':<22} {'requests':>9} {'req/s':>8} {'errors':>7} {'locked':>7} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    by_route = defaultdict(list)
+    for sample in results:
+        by_route[sample[0]].append(sample)
+    for name in [operation[0] for operation in OPERATIONS] + ['all']:
+        samples = results if name == 'all' else by_route.get(name, [])
+        if not samples:
+            continue
+        latencies = [sample[1] * 1000 for sample in samples]
+        errors = sum(1 for sample in samples if not sample[2])
+        locks = sum(1 for sample in samples if sample[3])
+        print(f"{name:<22} {len(samples):>9} {len(samples) / seconds:>8.1f} {errors:>7} {locks:>7} "
+              f"{statistics.median(latencies):>9.1f} {percentile(latencies, 0.99):>9.1f} {max(latencies):>9.1f}")
+
+
+def main():
+    args = sys.argv[1:]
+    threads = option(args, '--threads', 16)
+    processes = option(args, '--processes', 1)
+    seconds = option(args, '--seconds', 10.0)
+    baseline = '--baseline' in args
+
+    # Configure the app through the environment before anything imports it
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='stress_'), 'stress.db')
+    if baseline:
+        os.environ.update(BASELINE_ENV)
+    os.environ.setdefault('WEB_THREADS', str(threads))
+    seed()
+
+    if processes == 1:
+        results = run_worker(threads, seconds, 0)
+    else:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes) as pool:
+            batches = pool.starmap(run_worker, [(threads, seconds, i) for i in range(processes)])
+        results = [sample for batch in batches for sample in batch]
+
+    pragmas = 'SQLite defaults (--baseline)' if baseline else 'tuned pragmas'
+    report(results, seconds, f"{processes} process(es) x {threads} threads, {seconds:g}s, {pragmas}")
+
+
+if __name__ == '__main__':
+    main()
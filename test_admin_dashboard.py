@@ -0,0 +1,29 @@
+import re
+from urllib.parse import parse_qs, urlsplit
+
+from app import app
+from test_stats import login
+
+
+def test_table_links_and_forms_keep_the_other_tables_state():
+    client = app.test_client()
+    login(client, 'admin', 1)
+    args = {'donor_blood_group': 'O-', 'donor_sort': 'name', 'donor_after': 'abc',
+            'receiver_geocoded': '1', 'receiver_order': 'desc', 'receiver_after': 'xyz'}
+    html = client.get('/admin-dashboard', query_string=args).get_data(as_text=True)
+
+    first_pages = {}
+    for href in re.findall(r'<a href="([^"]*)"[^>]*>First page</a>', html):
+        url = urlsplit(href.replace('&amp;', '&'))
+        first_pages[url.fragment] = {name: values[0] for name, values in parse_qs(url.query).items()}
+    # Back to the first page of one table: its filters and the other table stay
+    assert first_pages['donors-section'] == {key: value for key, value in args.items() if key != 'donor_after'}
+    assert first_pages['receivers-section'] == {key: value for key, value in args.items() if key != 'receiver_after'}
+
+    forms = re.findall(r'<form method="GET" action="/admin-dashboard#(\w+-section)"(.*?)</form>', html, re.S)
+    assert len(forms) == 2
+    # Filtering one table keeps the other where it is
+    hidden = {section: dict(re.findall(r'<input type="hidden" name="(\w+)" value="([^"]*)">', form))
+              for section, form in forms}
+    assert hidden['donors-section'] == {'receiver_geocoded': '1', 'receiver_order': 'desc', 'receiver_after': 'xyz'}
+    assert hidden['receivers-section'] == {'donor_blood_group': 'O-', 'donor_sort': 'name', 'donor_after': 'abc'}
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+import app as app_module
+from app import app, db, Donor, geocode_queries
+from asgi import BloodFinderASGI
+from asgi_bridge import WSGIBridge
+from async_geocoding import AsyncGeocoder, AsyncRateLimiter
+from bench_async import FakeAsyncNominatim
+from geocode_cache import GeocodeCache
+from geocode_queue import RateLimiter
+from spatial_index import grid_cell
+
+
+async def call(asgi_app, method, path, body=b'', content_type=None):
+    headers = [(b'content-type', content_type.encode())] if content_type else []
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': headers}
+    messages = [{'type': 'http.request', 'body': body}]
+    response = {'body': b''}
+    done = asyncio.Event()
+
+    async def receive():
+        # Like a server: the client disconnects after the response
+        if messages:
+            return messages.pop()
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+            if not message.get('more_body'):
+                done.set()
+
+    await asgi_app(scope, receive, send)
+    return response['status'], response['body']
+
+
+def test_concurrent_searches_share_one_async_lookup(monkeypatch):
+    with app.app_context():
+        donor = Donor(name='asgi-donor', email='asgi-donor@test', password='x', age=30, gender='F',
+                      blood_group='A-', location='Asgi Town', contact='1', latitude=12.98, longitude=77.60,
+                      geocoded=True, grid_cell=grid_cell(12.98, 77.60))
+        db.session.add(donor)
+        db.session.commit()
+    cache = GeocodeCache(os.path.join(tempfile.mkdtemp(prefix='asgi_test_'), 'cache.db'))
+    monkeypatch.setattr(app_module, 'geocode_cache', cache)
+    backend = FakeAsyncNominatim(latency=0.05)
+    geocoder = AsyncGeocoder(cache, AsyncRateLimiter(RateLimiter(0.01)), backend, queries=geocode_queries)
+    asgi_app = BloodFinderASGI(app, geocoder, threads=2)
+
+    async def scenario():
+        form = urlencode({'location': 'Asgi Town', 'blood_group': 'A-', 'radius': '10'}).encode()
+        searches = await asyncio.gather(*(
+            call(asgi_app, 'POST', '/search-donors', form, 'application/x-www-form-urlencoded') for _ in range(20)
+        ))
+        reverse = await call(asgi_app, 'POST', '/api/reverse-geocode',
+                             json.dumps({'latitude': 12.98, 'longitude': 77.60}).encode(), 'application/json')
+        missing = await call(asgi_app, 'POST', '/api/reverse-geocode', b'{}', 'application/json')
+        # Everything else is the Flask app
+        stats = await call(asgi_app, 'GET', '/api/stats')
+        return searches, reverse, missing, stats
+
+    searches, reverse, missing, stats = asyncio.run(scenario())
+    assert all(status == 200 and b'asgi-donor' in body for status, body in searches)
+    assert geocoder.lookups == 2  # one geocode shared by all searches, one reverse
+    assert cache.get('Asgi Town')['success']
+    assert json.loads(reverse[1]) == {'address': '12.98, 77.6', 'success': True}
+    assert json.loads(missing[1]) == {'success': False, 'error': 'Coordinates required'}
+    assert stats[0] == 200 and 'donors' in json.loads(stats[1])
+
+
+def test_bridge_releases_the_thread_when_the_client_disconnects():
+    closed = threading.Event()
+
+    def endless(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+        def chunks():
+            try:
+                while True:
+                    yield b'tick\n'
+                    time.sleep(0.05)
+            finally:
+                closed.set()
+        return chunks()
+
+    bridge = WSGIBridge(endless, threads=1)
+    scope = {'type': 'http', 'method': 'GET', 'path': '/events', 'query_string': b'', 'headers': []}
+
+    async def scenario():
+        gone = asyncio.Event()
+        received = []
+
+        async def receive():
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message.get('body'):
+                received.append(message['body'])
+                # The browser tab closes after the first chunk
+                gone.set()
+
+        await asyncio.wait_for(bridge(scope, receive, send, body=b''), 2)
+        return received
+
+    assert asyncio.run(scenario())
+    assert closed.wait(2)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import backfill_geocode
+from app import app, db, Donor, Receiver, BloodRequest, RequestMatch
+from geocode_cache import normalize_address
+from geocode_queue import SharedRateLimiter
+
+
+def fake_geocoder(calls, during_call=lambda: None):
+    def geocode(address):
+        calls.append(address)
+        during_call()
+        if 'nowhere' in address.lower():
+            return {'success': False, 'error': 'not found'}
+        return {'success': True, 'latitude': 15.0 + len(calls) / 100, 'longitude': 75.0}
+    return geocode
+
+
+def test_backfill_geocodes_each_address_once_and_resumes(monkeypatch):
+    with app.app_context():
+        db.session.add_all([
+            Donor(name='Backfill 1', email='backfill1@test', password='x', age=30, gender='F',
+                  blood_group='O+', location='Gadag', contact='1'),
+            Donor(name='Backfill 2', email='backfill2@test', password='x', age=30, gender='F',
+                  blood_group='O+', location='  GADAG ', contact='1'),
+            Donor(name='Backfill 3', email='backfill3@test', password='x', age=30, gender='F',
+                  blood_group='O+', location='Nowhere Town', contact='1'),
+            # Stale coordinates are refreshed, fresh ones are left alone
+            Donor(name='Backfill 4', email='backfill4@test', password='x', age=30, gender='F',
+                  blood_group='O+', location='Haveri', contact='1', latitude=1.0, longitude=1.0,
+                  geocoded=True, last_geocoded=datetime.now() - timedelta(days=400)),
+            Donor(name='Backfill 5', email='backfill5@test', password='x', age=30, gender='F',
+                  blood_group='O+', location='Karwar', contact='1', latitude=1.0, longitude=1.0,
+                  geocoded=True, last_geocoded=datetime.now()),
+            Receiver(name='Backfill R', email='backfill-r@test', password='x', location='gadag', contact='1'),
+        ])
+        db.session.flush()
+        receiver_id = Receiver.query.filter_by(email='backfill-r@test').one().id
+        # An active request next to where the fake geocoder puts Gadag
+        db.session.add(BloodRequest(
+            receiver_id=receiver_id, blood_group_needed='O+', quantity_needed='1 unit', urgency='High',
+            hospital_name='Backfill Hospital', hospital_location='Gadag', latitude=15.0, longitude=75.0,
+            needed_by_date=datetime.now() + timedelta(days=3), contact_person='x', contact_number='1'
+        ))
+        db.session.commit()
+
+    def commit_elsewhere():
+        # Another process writing while the backfill waits for Nominatim
+        with db.engine.begin() as conn:
+            conn.execute(db.update(Receiver).where(Receiver.id == receiver_id).values(contact=f'call {len(calls)}'))
+
+    calls = []
+    monkeypatch.setattr(backfill_geocode, 'geocode_address_free', fake_geocoder(calls, commit_elsewhere))
+    quiet = lambda *args: None
+
+    first = backfill_geocode.backfill(batch_size=1, limit=2, restart=True, report=quiet)
+    assert not first['finished'] and first['addresses'] == 2
+    second = backfill_geocode.backfill(batch_size=2, report=quiet)
+    assert second['finished'] and second['addresses'] == len(calls)
+
+    keys = [normalize_address(address) for address in calls]
+    assert len(keys) == len(set(keys)) and 'gadag' in keys and 'karwar' not in keys
+
+    with app.app_context():
+        gadag = Donor.query.filter(Donor.email.in_(['backfill1@test', 'backfill2@test'])).all()
+        receiver = Receiver.query.filter_by(email='backfill-r@test').one()
+        assert all(donor.geocoded and donor.grid_cell is not None for donor in gadag)
+        assert {donor.latitude for donor in gadag} == {receiver.latitude}
+        assert Donor.query.filter_by(email='backfill4@test').one().latitude != 1.0
+        assert Donor.query.filter_by(email='backfill5@test').one().latitude == 1.0
+        assert not Donor.query.filter_by(email='backfill3@test').one().geocoded
+        matched = {match.donor_id for match in RequestMatch.query.join(BloodRequest)
+                   .filter(BloodRequest.hospital_name == 'Backfill Hospital')}
+        assert matched >= {donor.id for donor in gadag}
+    assert not os.path.exists(os.path.join(app.instance_path, 'geocode_backfill.json'))
+
+
+def test_shared_rate_limiter_spaces_calls_across_instances():
+    path = os.path.join(tempfile.mkdtemp(prefix='rate_limit_test_'), 'limit.db')
+    # Two instances stand in for two processes sharing the file
+    limiters = [SharedRateLimiter(path, 0.05), SharedRateLimiter(path, 0.05)]
+    started = time.monotonic()
+    for n in range(5):
+        limiters[n % 2].wait()
+    assert time.monotonic() - started >= 0.2
@@ -0,0 +1,24 @@
+import math
+
+import pytest
+
+import distance_engine
+from distance_engine import EARTH_RADIUS_KM, distances_within
+
+
+def lon_at(distance_km):
+    """Longitude on the equator distance_km east of (0, 0)"""
+    return math.degrees(distance_km / EARTH_RADIUS_KM)
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_radius_is_checked_before_rounding(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(distance_engine, 'np', None)
+    elif distance_engine.np is None:
+        pytest.skip('NumPy is not installed')
+    # Rounds to exactly 10.0 km, yet lies outside a 10 km radius
+    lons = [lon_at(10.0004), lon_at(9.9996), lon_at(3.0)]
+    indices, distances = distances_within(0.0, 0.0, [0.0] * 3, lons, 10, refine=False)
+    assert indices == [2, 1]
+    assert distances == [3.0, 10.0]
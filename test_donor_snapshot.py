@@ -0,0 +1,47 @@
+import app as app_module
+from app import app, db, Donor, Stat, get_donor_snapshot
+from spatial_index import grid_cell
+
+
+def search(lat, lon):
+    with app.app_context():
+        return {donor_id for donor_id, _ in get_donor_snapshot().query(lat, lon, 5)}
+
+
+def test_snapshot_follows_own_commits_and_reloads_after_other_writers(monkeypatch):
+    loads = []
+    load = app_module.donor_snapshot.load
+    monkeypatch.setattr(app_module.donor_snapshot, 'load', lambda *args, **kwargs: loads.append(1) or load(*args, **kwargs))
+    with app.app_context():
+        donor = Donor(name='snapshot-donor', email='snapshot-donor@test', password='x', age=30, gender='F',
+                      blood_group='B-', location='Snapshot Town', contact='1', availability=True)
+        db.session.add(donor)
+        db.session.commit()
+        donor_id = donor.id
+    search(20.0, 80.0)
+    loads.clear()
+
+    # This process's own writes are applied on commit, without a reload
+    with app.app_context():
+        donor = db.session.get(Donor, donor_id)
+        app_module.set_coordinates(donor, 20.0, 80.0)
+        db.session.commit()
+    assert donor_id in search(20.0, 80.0)
+    assert not loads
+
+    # Another process (or script) moves the donor and bumps the version
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(db.update(Donor).where(Donor.id == donor_id)
+                     .values(latitude=21.0, longitude=81.0, grid_cell=grid_cell(21.0, 81.0)))
+        app_module.stats_tracker.apply(conn, {'donors.version': 1})
+    assert donor_id in search(21.0, 81.0)
+    assert donor_id not in search(20.0, 80.0)
+    assert len(loads) == 1
+
+    # Bulk statements from this process are not replayed: they force a reload too
+    with app.app_context():
+        db.session.execute(db.update(Donor).where(Donor.id == donor_id).values(availability=False))
+        db.session.commit()
+        assert db.session.get(Stat, 'donors.version').value > 0
+    assert donor_id not in search(21.0, 81.0)
+    assert len(loads) == 2
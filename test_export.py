@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+
+from app import app, db, Donor, EXPORT_VIEWS
+from test_stats import login
+
+
+def add_donors(count):
+    with app.app_context():
+        db.session.add_all(
+            Donor(name=f'Export {n}', email=f'export{n}@test', password='x', age=30, gender='F',
+                  blood_group='A-', location='Hubli', contact='1')
+            for n in range(count)
+        )
+        db.session.commit()
+        return db.session.query(db.func.count(Donor.id)).scalar()
+
+
+def test_admin_export_streams_every_view():
+    total = add_donors(7)
+    client = app.test_client()
+    assert client.get('/admin/export/donors').status_code == 302
+
+    login(client, 'admin', 1)
+    app.config['EXPORT_BATCH_SIZE'] = 3
+    try:
+        response = client.get('/admin/export/donors?format=csv')
+        assert response.is_streamed and response.content_length is None
+        chunks = list(response.response)
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        assert len(rows) == total and len(chunks) >= total // 3
+        assert 'password' not in rows[0] and rows[-1]['name'] == 'Export 6'
+
+        lines = client.get('/admin/export/donors?format=jsonl').get_data(as_text=True).splitlines()
+        assert [json.loads(line)['id'] for line in lines] == sorted(int(row['id']) for row in rows)
+
+        for view in EXPORT_VIEWS:
+            assert client.get(f'/admin/export/{view}?format=jsonl').status_code == 200
+    finally:
+        app.config['EXPORT_BATCH_SIZE'] = 1000
+
+    assert client.get('/admin/export/admins').status_code == 404
+    assert client.get('/admin/export/donors?format=xml').status_code == 404
@@ -0,0 +1,69 @@
+import app as app_module
+from app import app
+from gazetteer import Gazetteer
+
+
+def test_bundled_table_resolves_addresses_and_points():
+    gazetteer = Gazetteer.load(app.config['GAZETTEER_PATH'])
+    assert 'Hubballi' in gazetteer.geocode('Hubli')['full_address']
+    # Aliases, typos and pincodes
+    assert 'Belagavi' in gazetteer.geocode('Belgaum')['full_address']
+    assert 'Belagavi' in gazetteer.geocode('belgavi')['full_address']
+    assert 'Koramangala' in gazetteer.geocode('560034')['full_address']
+    # Same name, told apart by the rest of the address
+    assert 'Pune' in gazetteer.geocode('Shivajinagar, Pune')['full_address']
+    assert 'Bengaluru' in gazetteer.geocode('Shivajinagar, Bangalore')['full_address']
+    # Parts it cannot place (streets, hospitals, localities it lacks) leave
+    # the address to Nominatim, with the rest of it as a partial match
+    for address, place in [('Sagar Hospital, Jayanagar, Bangalore', 'Jayanagar'),
+                           ('Mysore Road, Bangalore', 'Bengaluru'),
+                           ('Prashant Nagar, Hubli', 'Hubballi'),
+                           ('4th Block, 560034', 'Koramangala')]:
+        assert gazetteer.geocode(address) is None
+        assert place in gazetteer.geocode(address, partial=True)['full_address']
+    assert gazetteer.geocode('Asgi Town', partial=True) is None
+    # Regions are not places: "NCR" spans Gurugram, Noida and Ghaziabad
+    assert gazetteer.geocode('NCR') is None
+    assert gazetteer.geocode('Sector 29, NCR', partial=True) is None
+    assert 'Gurugram' in gazetteer.geocode('Gurgaon, NCR', partial=True)['full_address']
+
+    assert 'Hubballi' in gazetteer.reverse(15.36, 75.125)['address']
+    assert gazetteer.reverse(20.0, 60.0) is None
+
+
+def test_known_places_skip_nominatim(monkeypatch):
+    class NoNetwork:
+        def geocode(self, query, timeout=None):
+            raise AssertionError(f'Nominatim called for {query}')
+
+        reverse = geocode
+
+    monkeypatch.setattr(app_module, 'geolocator', NoNetwork())
+    result = app_module.geocode_address_free('Haliyal, Karnataka')
+    assert result['success'] and abs(result['latitude'] - 15.33) < 0.05
+    assert 'Dharwad' in app_module.reverse_geocode_free(15.46, 75.01)['address']
+    # Misses still go to Nominatim
+    assert 'Nominatim called' in app_module.geocode_address_free('Nowhere Land')['error']
+
+
+def test_street_addresses_ask_nominatim_first(monkeypatch):
+    asked = []
+
+    class Nominatim:
+        def geocode(self, query, timeout=None):
+            asked.append(query)
+            if 'MG Road' in query:
+                return type('Location', (), {'latitude': 12.975, 'longitude': 77.606, 'address': 'MG Road'})
+            return None
+
+    monkeypatch.setattr(app_module, 'geolocator', Nominatim())
+    monkeypatch.setattr(app_module.nominatim_limiter, 'wait', lambda count=1: None)
+    monkeypatch.setattr(app_module.geocode_cache, 'get', lambda query: None)
+    monkeypatch.setattr(app_module.geocode_cache, 'set', lambda query, result: None)
+
+    street = app_module.geocode_address_free('12 MG Road, Bengaluru')
+    assert (street['latitude'], street['longitude']) == (12.975, 77.606)
+    # Nominatim does not know the hospital: the city from the gazetteer is the fallback
+    hospital = app_module.geocode_address_free('Manipal Hospital, Old Airport Road, Bangalore')
+    assert hospital['success'] and 'Bengaluru' in hospital['full_address']
+    assert asked[0] == '12 MG Road, Bengaluru' and 'Manipal Hospital, Old Airport Road, Bangalore' in asked
@@ -0,0 +1,47 @@
+import threading
+
+import app as app_module
+from app import app, db, Donor, geocode_user_location
+from geocode_queue import GeocodeQueue
+
+
+def test_coordinates_for_an_edited_location_are_discarded(monkeypatch):
+    with app.app_context():
+        donor = Donor(name='queue-donor', email='queue-donor@test', password='x', age=30, gender='F',
+                      blood_group='O+', location='Udupi', contact='1')
+        db.session.add(donor)
+        db.session.commit()
+        donor_id = donor.id
+
+    def edit_while_geocoding(address):
+        # The donor saves a new location while Nominatim answers
+        with db.engine.begin() as conn:
+            conn.execute(db.update(Donor).where(Donor.id == donor_id).values(location='Manipal'))
+        return {'success': True, 'latitude': 13.34, 'longitude': 74.74}
+
+    monkeypatch.setattr(app_module, 'geocode_address_free', edit_while_geocoding)
+    with app.app_context():
+        geocode_user_location('donor', donor_id)
+        donor = db.session.get(Donor, donor_id)
+        assert donor.location == 'Manipal'
+        assert not donor.geocoded and donor.latitude is None
+
+
+def test_job_can_be_queued_again_while_it_runs():
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def handler(kind, ident):
+        runs.append((kind, ident))
+        started.set()
+        release.wait(5)
+
+    geocode_queue = GeocodeQueue(app, handler, workers=1)
+    assert geocode_queue.enqueue('donor', 1)
+    assert started.wait(5)
+    # The location changed after the running job read it
+    assert geocode_queue.enqueue('donor', 1)
+    assert not geocode_queue.enqueue('donor', 1)
+    release.set()
+    geocode_queue.join()
+    assert runs == [('donor', 1), ('donor', 1)]
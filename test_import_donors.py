@@ -0,0 +1,83 @@
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from app import app, db, Donor, Receiver, BloodRequest, RequestMatch, get_donor_snapshot, password_policy
+from import_donors import import_file
+from test_stats import live_stats, rebuilt_stats
+
+FIELDS = ['name', 'email', 'password', 'age', 'gender', 'blood_group', 'location', 'contact',
+          'availability', 'latitude', 'longitude']
+
+
+def write_csv(rows):
+    path = os.path.join(tempfile.mkdtemp(prefix='import_test_'), 'donors.csv')
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def donor_row(n, **overrides):
+    row = {'name': f'Import {n}', 'email': f'import{n}@test', 'password': f'pw{n}', 'age': '30',
+           'gender': 'M', 'blood_group': 'B+', 'location': 'Dharwad', 'contact': '1',
+           'availability': 'yes', 'latitude': '15.45', 'longitude': '75.01'}
+    row.update(overrides)
+    return row
+
+
+def test_import_rejects_bad_rows_and_resumes_without_duplicates():
+    with app.app_context():
+        receiver = Receiver(name='import-receiver', email='import-receiver@test', password='x',
+                            location='Dharwad', contact='1')
+        db.session.add(receiver)
+        db.session.flush()
+        blood_request = BloodRequest(
+            receiver_id=receiver.id, blood_group_needed='B+', quantity_needed='1 unit', urgency='High',
+            hospital_name='Import Hospital', hospital_location='Dharwad', latitude=15.46, longitude=75.0,
+            needed_by_date=datetime.now() + timedelta(days=3), contact_person='x', contact_number='1'
+        )
+        db.session.add(blood_request)
+        db.session.commit()
+        request_id = blood_request.id
+        # Loaded before the import, as in a running server
+        get_donor_snapshot()
+    rebuilt_stats()
+    rows = [donor_row(n) for n in range(6)] + [
+        donor_row(6, blood_group='X+'),
+        donor_row(7, age='12'),
+        donor_row(8, email='import0@test'),
+        donor_row(9, latitude='', longitude=''),
+    ]
+    path = write_csv(rows)
+
+    first = import_file(path, batch_size=3, workers=0, limit=4, geocode=False, report=lambda *a: None)
+    assert (first['records'], first['inserted'], first['finished']) == (4, 4, False)
+    assert os.path.exists(path + '.checkpoint')
+
+    second = import_file(path, batch_size=3, workers=0, geocode=False, report=lambda *a: None)
+    assert (second['records'], second['inserted'], second['rejected']) == (10, 7, 3)
+    assert second['finished'] and not os.path.exists(path + '.checkpoint')
+    with open(path + '.rejects.jsonl') as f:
+        assert len(f.readlines()) == 3
+
+    # Running the file again rejects every row as already registered
+    again = import_file(path, workers=0, geocode=False, report=lambda *a: None)
+    assert again['inserted'] == 0
+
+    with app.app_context():
+        donors = Donor.query.filter(Donor.email.like('import%@test')).all()
+        assert len(donors) == 7
+        by_email = {donor.email: donor for donor in donors}
+        assert password_policy.verify(by_email['import3@test'].password, 'pw3')
+        assert by_email['import3@test'].geocoded and by_email['import3@test'].grid_cell is not None
+        assert not by_email['import9@test'].geocoded
+        # Donors with coordinates are matched and found by radius search right away
+        matched = {match.donor_id for match in RequestMatch.query.filter_by(request_id=request_id)}
+        assert matched == {donor.id for donor in donors if donor.geocoded}
+        found = {donor_id for donor_id, _ in get_donor_snapshot().query(15.45, 75.01, 1)}
+        assert found >= matched
+
+    assert live_stats() == rebuilt_stats()
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import app as app_module
+from app import app, db, Donor, Receiver, BloodRequest, DonationResponse, live_feed, match_new_request
+from spatial_index import grid_cell
+from test_stats import login
+
+
+def events(client, last_event_id):
+    # A zero-length stream sends what is already there, then ends
+    response = client.get('/events', headers={'Last-Event-ID': str(last_event_id)})
+    assert response.mimetype == 'text/event-stream'
+    messages = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            messages.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return messages
+
+
+def test_dashboards_receive_matches_responses_and_fulfilment(monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_STREAM_SECONDS', 0)
+    with app.app_context():
+        receiver = Receiver(name='live-receiver', email='live-receiver@test', password='x',
+                            location='Kochi', contact='1')
+        db.session.add(receiver)
+        donors = [Donor(name=f'live-{n}', email=f'live-{n}@test', password='x', age=30, gender='M',
+                        blood_group='O-', location='Kochi', contact='1', latitude=9.93, longitude=76.26,
+                        geocoded=True, grid_cell=grid_cell(9.93, 76.26))
+                  for n in range(2)]
+        db.session.add_all(donors)
+        db.session.flush()
+        blood_request = BloodRequest(
+            receiver_id=receiver.id, blood_group_needed='O-', quantity_needed='1 unit', urgency='High',
+            hospital_name='Live Hospital', hospital_location='Kochi', contact_person='x', contact_number='1',
+            needed_by_date=datetime.now() + timedelta(days=2)
+        )
+        db.session.add(blood_request)
+        db.session.commit()
+        receiver_id, request_id = receiver.id, blood_request.id
+        chosen, other = (donor.id for donor in donors)
+
+        monkeypatch.setattr(app_module, 'geocode_address_free',
+                            lambda address: {'success': True, 'latitude': 9.94, 'longitude': 76.27})
+        match_new_request(request_id)
+        # Matching again does not announce the same request twice
+        match_new_request(request_id)
+
+    client = app.test_client()
+    login(client, 'donor', chosen)
+    (matched_id, kind, data), = events(client, 0)
+    assert (kind, data['request_id'], data['hospital_name']) == ('request.matched', request_id, 'Live Hospital')
+    assert data['distance_km'] < 5
+    assert events(client, matched_id) == []
+
+    login(client, 'receiver', receiver_id)
+    receiver_seen = max([event_id for event_id, _, _ in events(client, 0)], default=0)
+    for donor_id in (chosen, other):
+        login(client, 'donor', donor_id)
+        client.post(f'/respond-to-request/{request_id}', data={'action': 'accept', 'notes': 'on my way'})
+    login(client, 'receiver', receiver_id)
+    updates = events(client, receiver_seen)
+    assert [(kind, data['status'], data['donor_name']) for _, kind, data in updates] == \
+        [('response.updated', 'Accepted', 'live-0'), ('response.updated', 'Accepted', 'live-1')]
+
+    with app.app_context():
+        response_id = DonationResponse.query.filter_by(request_id=request_id, donor_id=chosen).one().id
+    client.post(f'/manage-donor-response/{response_id}', data={'action': 'confirm', 'notes': 'see you at 5'})
+
+    login(client, 'donor', chosen)
+    assert [(kind, data['status'], data['receiver_notes']) for _, kind, data in events(client, matched_id)] == \
+        [('response.updated', 'Confirmed', 'see you at 5')]
+    login(client, 'donor', other)
+    assert {(kind, data.get('status')) for _, kind, data in events(client, 0)} == \
+        {('request.matched', None), ('response.updated', 'Cancelled'), ('request.closed', 'Fulfilled')}
+
+
+def test_stream_wakes_on_commit_in_process():
+    with app.app_context():
+        with db.engine.connect() as conn:
+            after = live_feed.latest_id(conn, 'receiver', 999001)
+
+        def publish():
+            with app.app_context():
+                live_feed.publish(db.session.connection(), [
+                    {'audience': 'receiver', 'user_id': 999001, 'type': 'response.updated', 'data': {'n': 1}}
+                ])
+                db.session.commit()
+
+        threading.Timer(0.2, publish).start()
+        started = time.monotonic()
+        # The poll interval is far longer than the wait: only the commit can wake the stream
+        stream = live_feed.stream(db.engine, 'receiver', 999001, after, poll_interval=30, max_seconds=30,
+                                  until_events=True)
+        assert next(stream).startswith('retry:')
+        message = next(stream)
+        # A long poll ends with its first events
+        assert list(stream) == []
+    assert 'event: response.updated' in message
+    assert time.monotonic() - started < 5
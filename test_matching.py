@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+
+import app as app_module
+from app import app, db, Donor, Receiver, BloodRequest, DonationHistory, RequestMatch, Notification, match_new_request
+from matching import rank_donors
+from spatial_index import grid_cell
+from test_stats import login
+
+# Around Delhi, far from the donors other tests create
+HOSPITAL = (28.61, 77.21)
+
+
+def make_donor(name, blood_group='B-', lat=None, lon=None, **fields):
+    donor = Donor(name=name, email=f'{name}@test', password='x', age=30, gender='M', blood_group=blood_group,
+                  location='Delhi', contact='1', latitude=lat, longitude=lon, geocoded=lat is not None,
+                  grid_cell=grid_cell(lat, lon), **fields)
+    db.session.add(donor)
+    db.session.flush()
+    return donor.id
+
+
+def make_request(receiver_id, blood_group='AB-'):
+    blood_request = BloodRequest(
+        receiver_id=receiver_id, blood_group_needed=blood_group, quantity_needed='1 unit', urgency='High',
+        hospital_name='Match Hospital', hospital_location='AIIMS, Delhi',
+        needed_by_date=datetime.now() + timedelta(days=3), contact_person='x', contact_number='1'
+    )
+    db.session.add(blood_request)
+    db.session.flush()
+    return blood_request.id
+
+
+def test_rank_donors_prefers_near_and_rested_donors():
+    now = datetime(2026, 1, 1)
+    ranked = rank_donors(
+        [(1, 5.0), (2, 5.0), (3, 40.0), (4, 1.0)],
+        {2: now - timedelta(days=200), 4: now - timedelta(days=10)},
+        radius_km=50, now=now, min_gap_days=90
+    )
+    assert [donor_id for donor_id, _, _ in ranked] == [1, 2, 3]
+
+
+def test_new_request_is_matched_to_ranked_nearby_donors(monkeypatch):
+    with app.app_context():
+        receiver = Receiver(name='match-receiver', email='match-receiver@test', password='x',
+                            location='Delhi', contact='1')
+        db.session.add(receiver)
+        db.session.flush()
+        near = make_donor('match-near', lat=28.62, lon=77.22)
+        nearer_tired = make_donor('match-tired', lat=28.611, lon=77.211)
+        db.session.add(DonationHistory(donor_id=nearer_tired, blood_type='B-', quantity='1 unit',
+                                       location='Delhi', donation_date=datetime.now() - timedelta(days=120)))
+        far = make_donor('match-far', lat=19.07, lon=72.87)
+        incompatible = make_donor('match-incompatible', blood_group='B+', lat=28.62, lon=77.22)
+        unavailable = make_donor('match-unavailable', lat=28.62, lon=77.22, availability=False)
+        recent = make_donor('match-recent', lat=28.62, lon=77.22)
+        db.session.add(DonationHistory(donor_id=recent, blood_type='B-', quantity='1 unit',
+                                       location='Delhi', donation_date=datetime.now() - timedelta(days=10)))
+        unlocated = make_donor('match-unlocated')
+        located_request = make_request(receiver.id)
+        unlocated_request = make_request(receiver.id)
+        db.session.commit()
+        receiver_id = receiver.id
+
+        monkeypatch.setattr(app_module, 'geocode_address_free',
+                            lambda address: {'success': True, 'latitude': HOSPITAL[0], 'longitude': HOSPITAL[1]})
+        match_new_request(located_request)
+        monkeypatch.setattr(app_module, 'geocode_address_free', lambda address: {'success': False})
+        match_new_request(unlocated_request)
+
+        matches = RequestMatch.query.filter_by(request_id=located_request)\
+            .order_by(RequestMatch.score.desc()).all()
+        assert [match.donor_id for match in matches] == [near, nearer_tired]
+        assert matches[0].distance_km < 5
+        anywhere = {match.donor_id for match in RequestMatch.query.filter_by(request_id=unlocated_request)}
+        assert {near, nearer_tired, far, unlocated} <= anywhere
+        assert not {incompatible, unavailable, recent} & anywhere
+
+    client = app.test_client()
+    login(client, 'donor', near)
+    assert b'Match Hospital' in client.get('/donor-dashboard').data
+    login(client, 'donor', incompatible)
+    assert b'Match Hospital' not in client.get('/donor-dashboard').data
+
+    # Availability changes re-match the donor
+    login(client, 'donor', near)
+    client.post('/toggle-availability')
+    with app.app_context():
+        assert RequestMatch.query.filter_by(donor_id=near).count() == 0
+    client.post('/toggle-availability')
+    with app.app_context():
+        assert {match.request_id for match in RequestMatch.query.filter_by(donor_id=near)} == \
+            {located_request, unlocated_request}
+
+    login(client, 'receiver', receiver_id)
+    client.post(f'/delete-request/{located_request}')
+    with app.app_context():
+        assert RequestMatch.query.filter_by(request_id=located_request).count() == 0
+
+
+def test_created_request_is_matched_at_once_and_requeued_if_unmatched(monkeypatch):
+    with app.app_context():
+        receiver = Receiver(name='sync-receiver', email='sync-receiver@test', password='x',
+                            location='Delhi', contact='1')
+        db.session.add(receiver)
+        db.session.flush()
+        donor = make_donor('match-sync', lat=28.63, lon=77.2)
+        db.session.commit()
+        receiver_id = receiver.id
+
+    jobs = []
+    monkeypatch.setattr(app_module.geocode_queue, 'enqueue', lambda *job: jobs.append(job) or True)
+    monkeypatch.setattr(app_module, 'offline_coordinates', lambda address: HOSPITAL)
+    client = app.test_client()
+    login(client, 'receiver', receiver_id)
+    client.post('/create-request', data={
+        'requesting_for': 'self', 'blood_group_needed': 'AB-', 'quantity_needed': '1 unit', 'urgency': 'Medium',
+        'hospital_name': 'Sync Hospital', 'hospital_location': 'AIIMS, Delhi',
+        'needed_by_date': (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d'),
+        'contact_person': 'x', 'contact_number': '1',
+    })
+
+    with app.app_context():
+        blood_request = BloodRequest.query.filter_by(hospital_name='Sync Hospital').one()
+        # Matched before the geocode job runs, which refines the matches later
+        assert (blood_request.latitude, blood_request.longitude) == HOSPITAL
+        assert donor in {match.donor_id for match in RequestMatch.query.filter_by(request_id=blood_request.id)}
+        assert jobs == [('request', blood_request.id)]
+
+        # A request left without matches is matched again by the deployment sweep
+        RequestMatch.query.filter_by(request_id=blood_request.id).delete()
+        db.session.commit()
+        matched = []
+        monkeypatch.setattr(app_module, 'match_new_request', matched.append)
+        app_module.match_unmatched_requests()
+        assert blood_request.id in matched
+
+
+def test_direct_request_is_never_matched_to_other_donors(monkeypatch):
+    with app.app_context():
+        receiver = Receiver(name='direct-receiver', email='direct-receiver@test', password='x',
+                            location='Delhi', contact='1')
+        db.session.add(receiver)
+        db.session.flush()
+        target = make_donor('direct-target', blood_group='O-', lat=28.64, lon=77.23)
+        bystander = make_donor('direct-bystander', blood_group='O-', lat=28.64, lon=77.23)
+        db.session.commit()
+        receiver_id = receiver.id
+
+    client = app.test_client()
+    login(client, 'receiver', receiver_id)
+    client.post(f'/send-request-to-donor/{target}', data={
+        'blood_group_needed': 'O-', 'quantity_needed': '1 unit', 'urgency': 'Critical',
+        'hospital_name': 'Direct Hospital', 'hospital_location': 'AIIMS, Delhi',
+        'needed_by_date': (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d'),
+        'contact_person': 'x', 'contact_number': '1',
+    })
+
+    matched = []
+    monkeypatch.setattr(app_module, 'match_new_request', matched.append)
+    with app.app_context():
+        blood_request = BloodRequest.query.filter_by(hospital_name='Direct Hospital').one()
+        assert blood_request.direct_donor_id == target
+        # Neither the deployment sweep nor a donor re-match fans it out
+        app_module.match_unmatched_requests()
+        assert blood_request.id not in matched
+        app_module.rematch_donor(db.session.get(Donor, bystander))
+        db.session.commit()
+        assert RequestMatch.query.filter_by(request_id=blood_request.id).count() == 0
+        alerted = {n.donor_id for n in Notification.query.filter_by(request_id=blood_request.id)}
+        assert alerted == {target}
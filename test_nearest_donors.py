@@ -0,0 +1,40 @@
+from app import app, db, Donor
+from nearest_donors import encode_cursor
+from spatial_index import grid_cell
+from test_stats import login
+
+# Around Jaipur, far from the donors other tests create
+CENTER = (26.91, 75.79)
+
+
+def test_nearest_donors_pages_with_stateless_cursors():
+    with app.app_context():
+        donors = [Donor(name=f'nearest-{n}', email=f'nearest-{n}@test', password='x', age=30, gender='F',
+                        blood_group='A+', location='Jaipur', contact=f'9{n}', availability=True,
+                        latitude=CENTER[0] + n / 100, longitude=CENTER[1],
+                        geocoded=True, grid_cell=grid_cell(CENTER[0] + n / 100, CENTER[1]))
+                  for n in range(7)]
+        db.session.add_all(donors)
+        db.session.commit()
+        expected = [donor.id for donor in donors]
+
+    client = app.test_client()
+    query = {'lat': CENTER[0], 'lon': CENTER[1], 'blood_group': 'A+', 'k': 3}
+    # Contact numbers are for logged-in receivers and admins only
+    assert client.get('/api/donors/nearest', query_string=query).status_code == 401
+
+    login(client, 'receiver', 1)
+    seen, cursor = [], None
+    while True:
+        args = {'cursor': cursor, 'k': 3} if cursor else query
+        data = client.get('/api/donors/nearest', query_string=args).get_json()
+        seen += [donor['id'] for donor in data['donors']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == expected
+
+    bad = encode_cursor(CENTER[0], CENTER[1], 'A+', -3, 1.0)
+    for cursor in (bad, 'not-a-cursor'):
+        response = client.get('/api/donors/nearest', query_string={'cursor': cursor})
+        assert response.status_code == 400
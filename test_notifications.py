@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import app as app_module
+from app import app, db, Donor, Receiver, BloodRequest, Notification, outbox, match_new_request
+from notifications import Dispatcher, FileTransport
+from spatial_index import grid_cell
+from test_stats import login
+
+
+class RecordingTransport:
+    batch_size = 100
+    rate = 20
+
+    def __init__(self):
+        self.batches = []
+
+    def send(self, messages):
+        self.batches.append(len(messages))
+        return {}
+
+
+class FailingTransport:
+    batch_size = 10
+    rate = None
+
+    def send(self, messages):
+        raise ConnectionError('gateway down')
+
+
+def test_critical_request_alerts_matched_donors_once(monkeypatch):
+    with app.app_context():
+        receiver = Receiver(name='notify-receiver', email='notify-receiver@test', password='x',
+                            location='Pune', contact='1')
+        db.session.add(receiver)
+        db.session.add_all(
+            Donor(name=f'notify-{n}', email=f'notify-{n}@test', password='x', age=30, gender='F',
+                  blood_group='A+', location='Pune', contact=f'98000000{n}', latitude=18.52, longitude=73.85,
+                  geocoded=True, grid_cell=grid_cell(18.52, 73.85))
+            for n in range(3)
+        )
+        db.session.flush()
+        blood_request = BloodRequest(
+            receiver_id=receiver.id, blood_group_needed='A+', quantity_needed='2 units', urgency='Critical',
+            hospital_name='Notify Hospital', hospital_location='Pune', contact_person='x', contact_number='1',
+            needed_by_date=datetime.now() + timedelta(days=1)
+        )
+        db.session.add(blood_request)
+        db.session.commit()
+        request_id = blood_request.id
+
+        monkeypatch.setattr(app_module, 'geocode_address_free',
+                            lambda address: {'success': True, 'latitude': 18.53, 'longitude': 73.86})
+        match_new_request(request_id)
+        match_new_request(request_id)
+        queued = Notification.query.filter_by(request_id=request_id).all()
+        assert sorted(message.channel for message in queued) == ['email'] * 3 + ['sms'] * 3
+        assert all('Notify Hospital' in message.subject for message in queued)
+
+        path = os.path.join(tempfile.mkdtemp(prefix='notify_test_'), 'out.jsonl')
+        transport = FileTransport(path, batch_size=4)
+        dispatcher = Dispatcher(db.engine, outbox, {'email': transport, 'sms': transport})
+        dispatcher.run_once()
+        # End the session's read transaction to see the dispatcher's writes
+        db.session.commit()
+        assert {message.status for message in Notification.query.filter_by(request_id=request_id)} == {'Sent'}
+        with open(path) as f:
+            sent = [json.loads(line) for line in f]
+        assert {message['recipient'] for message in sent} >= {f'notify-{n}@test' for n in range(3)}
+
+
+def test_failed_sends_back_off_then_give_up():
+    with app.app_context():
+        with db.engine.begin() as conn:
+            outbox.enqueue(conn, [{'dedup_key': 'sms:retry-test', 'channel': 'sms', 'recipient': '1',
+                                   'subject': 'x', 'body': 'x'}])
+        dispatcher = Dispatcher(db.engine, outbox, {'sms': FailingTransport()}, max_attempts=2, backoff_seconds=60)
+
+        dispatcher.run_once()
+        message = Notification.query.filter_by(dedup_key='sms:retry-test').one()
+        assert (message.status, message.attempts) == ('Pending', 1)
+        assert message.next_attempt_at > datetime.now() + timedelta(seconds=50)
+        assert 'gateway down' in message.last_error
+
+        # Not due yet: nothing is sent until the backoff has passed
+        assert dispatcher.run_once() == 0
+        message.next_attempt_at = datetime.now()
+        db.session.commit()
+        dispatcher.run_once()
+        db.session.refresh(message)
+        assert (message.status, message.attempts) == ('Failed', 2)
+
+
+def test_rate_limited_batches_hold_one_second_of_messages():
+    transport = RecordingTransport()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            outbox.enqueue(conn, [{'dedup_key': f'sms:rate-test-{n}', 'channel': 'sms', 'recipient': '1',
+                                   'subject': 'x', 'body': 'x'} for n in range(50)])
+        dispatcher = Dispatcher(db.engine, outbox, {'sms': transport})
+        waits = []
+        dispatcher.limiters['sms'].wait = waits.append
+        assert dispatcher.run_once() >= 50
+    # 20 messages/second: each batch waits for its own second
+    assert max(transport.batches) == 20 and waits == transport.batches
+
+
+def test_deleting_requests_and_donors_drops_their_unsent_alerts(monkeypatch):
+    with app.app_context():
+        receiver = Receiver(name='forget-receiver', email='forget-receiver@test', password='x',
+                            location='Nashik', contact='1')
+        donors = [Donor(name=f'forget-{n}', email=f'forget-{n}@test', password='x', age=30, gender='F',
+                        blood_group='B+', location='Nashik', contact=f'97000000{n}', latitude=20.0, longitude=73.78,
+                        geocoded=True, grid_cell=grid_cell(20.0, 73.78)) for n in range(2)]
+        db.session.add_all([receiver] + donors)
+        db.session.flush()
+        request_ids = []
+        for hospital in ('Forget Hospital 1', 'Forget Hospital 2'):
+            blood_request = BloodRequest(
+                receiver_id=receiver.id, blood_group_needed='B+', quantity_needed='1 unit', urgency='Critical',
+                hospital_name=hospital, hospital_location='Nashik', contact_person='x', contact_number='1',
+                needed_by_date=datetime.now() + timedelta(days=1)
+            )
+            db.session.add(blood_request)
+            db.session.flush()
+            request_ids.append(blood_request.id)
+        db.session.commit()
+        receiver_id, donor_ids = receiver.id, [donor.id for donor in donors]
+
+        monkeypatch.setattr(app_module, 'geocode_address_free',
+                            lambda address: {'success': True, 'latitude': 20.0, 'longitude': 73.78})
+        for request_id in request_ids:
+            match_new_request(request_id)
+        sent = Notification.query.filter_by(request_id=request_ids[0], channel='email').first()
+        sent.status = 'Sent'
+        db.session.commit()
+        sent_id = sent.id
+
+    client = app.test_client()
+    login(client, 'receiver', receiver_id)
+    client.post(f'/delete-request/{request_ids[0]}')
+    login(client, 'admin', 1)
+    client.post(f'/admin/delete-donor/{donor_ids[0]}')
+
+    with app.app_context():
+        assert Notification.query.filter_by(request_id=request_ids[0]).count() == 0
+        assert Notification.query.filter_by(donor_id=donor_ids[0]).count() == 0
+        # What was sent stays, unlinked; the other donor's alert is untouched
+        kept = db.session.get(Notification, sent_id)
+        assert kept.status == 'Sent' and (kept.request_id, kept.donor_id) == (None, None)
+        assert {n.donor_id for n in Notification.query.filter_by(request_id=request_ids[1])} == {donor_ids[1]}
+        assert not db.session.execute(db.text('PRAGMA foreign_key_check(notification)')).all()
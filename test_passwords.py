@@ -0,0 +1,32 @@
+from werkzeug.security import generate_password_hash
+
+from app import app, db, Donor, Receiver, password_policy
+
+
+def test_login_rehashes_passwords_from_an_older_policy():
+    old_hash = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+    with app.app_context():
+        donor = Donor(name='legacy', email='legacy@test', password=old_hash, age=30, gender='M',
+                      blood_group='A+', location='Hubli', contact='1')
+        # Profile setup copies the hash to the second role
+        receiver = Receiver(name='legacy', email='legacy@test', password=old_hash, location='Hubli', contact='1')
+        db.session.add_all([donor, receiver])
+        db.session.commit()
+        donor_id, receiver_id = donor.id, receiver.id
+
+    client = app.test_client()
+    assert client.post('/login', data={'email': 'legacy@test', 'password': 'wrong'}).status_code == 401
+    with app.app_context():
+        assert db.session.get(Donor, donor_id).password == old_hash
+
+    assert client.post('/login', data={'email': 'legacy@test', 'password': 'secret'}).status_code == 302
+    with app.app_context():
+        hashes = {db.session.get(Donor, donor_id).password, db.session.get(Receiver, receiver_id).password}
+    assert len(hashes) == 1
+    new_hash = hashes.pop()
+    assert not password_policy.needs_rehash(new_hash)
+
+    # The upgraded hash still logs in and is left alone
+    assert app.test_client().post('/login', data={'email': 'legacy@test', 'password': 'secret'}).status_code == 302
+    with app.app_context():
+        assert db.session.get(Donor, donor_id).password == new_hash
@@ -0,0 +1,187 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import app, db, Donor, Receiver, BloodRequest, DonationResponse
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Transaction control (BEGIN IMMEDIATE, see sqlite_tuning.py) is not a query
+        if not statement.startswith('BEGIN'):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def make_receiver(name, request_count, responses_per_request=2):
+    """Create a receiver with blood requests, each answered by donors"""
+    with app.app_context():
+        receiver = Receiver(name=name, email=f'{name}@test', password='x', location='Hubli', contact='1')
+        db.session.add(receiver)
+        db.session.flush()
+        for i in range(request_count):
+            blood_request = BloodRequest(
+                receiver_id=receiver.id,
+                blood_group_needed='O+',
+                quantity_needed='1 unit',
+                urgency='High',
+                hospital_name='KIMS',
+                hospital_location='Hubli',
+                needed_by_date=datetime.now() + timedelta(days=2),
+                contact_person=name,
+                contact_number='1'
+            )
+            db.session.add(blood_request)
+            db.session.flush()
+            for j in range(responses_per_request):
+                donor = Donor(name=f'{name}-{i}-{j}', email=f'{name}-{i}-{j}@test', password='x', age=30,
+                              gender='M', blood_group='O+', location='Hubli', contact='1')
+                db.session.add(donor)
+                db.session.flush()
+                db.session.add(DonationResponse(request_id=blood_request.id, donor_id=donor.id, status='Accepted'))
+        db.session.commit()
+        return receiver.id
+
+
+def dashboard_query_count(path, role, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['role'] = role
+        sess['user_id'] = user_id
+    with count_queries() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_receiver_dashboard_query_count_is_constant():
+    small = make_receiver('receiver-small', request_count=1)
+    large = make_receiver('receiver-large', request_count=25)
+
+    small_count = dashboard_query_count('/receiver-dashboard', 'receiver', small)
+    large_count = dashboard_query_count('/receiver-dashboard', 'receiver', large)
+
+    assert small_count == large_count, (small_count, large_count)
+    assert large_count <= 4
+
+
+def make_donor(name, response_count):
+    """Create a donor who responded to requests, plus unanswered compatible requests"""
+    with app.app_context():
+        receiver = Receiver(name=name, email=f'{name}-receiver@test', password='x', location='Hubli', contact='1')
+        donor = Donor(name=name, email=f'{name}@test', password='x', age=30, gender='M',
+                      blood_group='O-', location='Hubli', contact='1')
+        db.session.add_all([receiver, donor])
+        db.session.flush()
+        for i in range(response_count * 2):
+            blood_request = BloodRequest(
+                receiver_id=receiver.id,
+                blood_group_needed='A+',
+                quantity_needed='1 unit',
+                urgency='Critical',
+                hospital_name='KIMS',
+                hospital_location='Hubli',
+                needed_by_date=datetime.now() + timedelta(days=2),
+                contact_person=name,
+                contact_number='1'
+            )
+            db.session.add(blood_request)
+            db.session.flush()
+            # Respond to half of the requests, leave the rest for the dashboard
+            if i < response_count:
+                status = 'Accepted' if i % 2 else 'Pending'
+                db.session.add(DonationResponse(request_id=blood_request.id, donor_id=donor.id, status=status))
+        db.session.commit()
+        return donor.id
+
+
+def test_donor_pages_query_count_is_constant():
+    small = make_donor('donor-small', response_count=1)
+    large = make_donor('donor-large', response_count=25)
+
+    for path in ('/donor-dashboard', '/my-responses'):
+        small_count = dashboard_query_count(path, 'donor', small)
+        large_count = dashboard_query_count(path, 'donor', large)
+        assert small_count == large_count, (path, small_count, large_count)
+
+
+def test_admin_dashboard_query_count_is_constant():
+    before = dashboard_query_count('/admin-dashboard', 'admin', None)
+    make_receiver('admin-growth', request_count=30)
+    after = dashboard_query_count('/admin-dashboard', 'admin', None)
+    assert before == after, (before, after)
+
+
+def test_login_and_role_switch_queries():
+    with app.app_context():
+        password = generate_password_hash('secret')
+        donor = Donor(name='switcher', email='switcher@test', password=password, age=30, gender='F',
+                      blood_group='B+', location='Hubli', contact='1')
+        receiver = Receiver(name='switcher', email='switcher@test', password=password, location='Hubli', contact='1')
+        db.session.add_all([donor, receiver])
+        db.session.commit()
+        donor_id, receiver_id = donor.id, receiver.id
+
+    client = app.test_client()
+    with count_queries() as statements:
+        response = client.post('/login', data={'email': 'switcher@test', 'password': 'secret'})
+    assert response.headers['Location'] == '/donor-dashboard'
+    assert len(statements) == 1, statements
+
+    with count_queries() as statements:
+        response = client.post('/switch-role', data={'role': 'receiver'})
+        availability = client.get('/check-role-availability/donor').get_json()
+    assert response.headers['Location'] == '/receiver-dashboard'
+    assert availability['available']
+    assert statements == []
+    with client.session_transaction() as sess:
+        assert sess['roles'] == {'donor': donor_id, 'receiver': receiver_id}
+        assert sess['user_id'] == receiver_id
+
+
+def test_role_cache_follows_profiles_set_up_or_deleted_elsewhere():
+    with app.app_context():
+        password = generate_password_hash('secret')
+        donor = Donor(name='stale', email='stale@test', password=password, age=30, gender='F',
+                      blood_group='B+', location='Hubli', contact='1')
+        db.session.add(donor)
+        db.session.commit()
+        donor_id = donor.id
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'stale@test', 'password': 'secret'})
+
+    # Another session sets up a receiver profile: switching finds it
+    with app.app_context():
+        receiver = Receiver(name='stale', email='stale@test', password=password, location='Hubli', contact='1')
+        db.session.add(receiver)
+        db.session.commit()
+        receiver_id = receiver.id
+    response = client.post('/switch-role', data={'role': 'receiver'})
+    assert response.headers['Location'] == '/receiver-dashboard'
+    # Setup pages send an existing profile to its dashboard
+    assert client.get('/setup-donor-profile').headers['Location'] == '/donor-dashboard'
+    client.post('/switch-role', data={'role': 'receiver'})
+
+    # An admin deletes it: the dashboard falls back to the donor profile
+    with app.app_context():
+        db.session.delete(db.session.get(Receiver, receiver_id))
+        db.session.commit()
+    assert client.get('/receiver-dashboard').headers['Location'] == '/donor-dashboard'
+    with client.session_transaction() as sess:
+        assert sess['roles'] == {'donor': donor_id}
+        assert (sess['role'], sess['user_id']) == ('donor', donor_id)
+    assert client.post('/switch-role', data={'role': 'receiver'}).headers['Location'] == '/setup-receiver-profile'
@@ -0,0 +1,90 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import (app, db, Donor, Receiver, BloodRequest, DonationResponse, DonationHistory, RequestMatch,
+                 available_donors, without_coordinates, donors_near, donation_history_query,
+                 donor_responses_query, matched_requests_query, donor_counts_query,
+                 receiver_requests_query, existing_response_query)
+from blood_compatibility import donors_for
+
+# A full table scan shows up as "SCAN <table>" with no index in the plan line
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def hot_queries(donor_id, receiver_id, request_id):
+    """The app.py queries behind the busiest routes, run the way the routes run them"""
+    available = available_donors(donors_for('A+'))
+    return {
+        'search: donors by blood group': available.all,
+        'search: pending donors': without_coordinates(available).all,
+        'search: bounding box': donors_near(available, 15.36, 75.12, 25).all,
+        'donor dashboard: history': donation_history_query(donor_id).all,
+        'donor dashboard: responses': donor_responses_query(donor_id).all,
+        'donor dashboard: matched requests': matched_requests_query(donor_id).all,
+        'donor dashboard: counts': donor_counts_query(donor_id).one,
+        'receiver dashboard: requests': receiver_requests_query(receiver_id).all,
+        'respond to request: existing response': existing_response_query(request_id, donor_id).first,
+        'my responses': donor_responses_query(donor_id, hidden_statuses=['Rejected', 'Declined']).all,
+    }
+
+
+@contextmanager
+def captured_selects():
+    """SELECT statements (with their parameters) executed inside the block"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def full_scans(statements):
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            scans += [row[-1] for row in plan if FULL_SCAN.match(row[-1])]
+    return scans
+
+
+def test_hot_queries_use_indexes():
+    with app.app_context():
+        donor = Donor(name='plan-donor', email='plan-donor@test', password='x', age=30, gender='F',
+                      blood_group='A+', location='Plan Town', contact='1', availability=True)
+        receiver = Receiver(name='plan-receiver', email='plan-receiver@test', password='x',
+                            location='Plan Town', contact='1')
+        db.session.add_all([donor, receiver])
+        db.session.flush()
+        blood_request = BloodRequest(
+            receiver_id=receiver.id, blood_group_needed='A+', quantity_needed='1 unit', urgency='High',
+            hospital_name='Plan Hospital', hospital_location='Plan Town',
+            needed_by_date=datetime.now() + timedelta(days=3), contact_person='x', contact_number='1'
+        )
+        db.session.add(blood_request)
+        db.session.flush()
+        # Rows for the eager loads to follow, so their SELECTs run too
+        db.session.add_all([
+            DonationResponse(request_id=blood_request.id, donor_id=donor.id, status='Pending'),
+            DonationHistory(donor_id=donor.id, blood_type='A+', quantity='1 unit', location='Plan Hospital'),
+            RequestMatch(request_id=blood_request.id, donor_id=donor.id, score=1.0, distance_km=1.0),
+        ])
+        db.session.commit()
+
+        failures = {}
+        for name, run in hot_queries(donor.id, receiver.id, blood_request.id).items():
+            with captured_selects() as statements:
+                run()
+            assert statements, f"{name} ran no query"
+            scans = full_scans(statements)
+            if scans:
+                failures[name] = scans
+    assert not failures, f"Full table scans: {failures}"
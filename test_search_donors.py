@@ -0,0 +1,28 @@
+import pytest
+
+from app import app, db
+from test_matching import make_donor
+
+
+# Off the coast, far from the donors other tests create (and from each other)
+@pytest.mark.parametrize('snapshot, lat, lon', [(True, 12.0, 89.0), (False, 13.0, 89.0)])
+def test_compatible_search_keeps_exact_matches_when_results_are_capped(monkeypatch, snapshot, lat, lon):
+    monkeypatch.setitem(app.config, 'DONOR_SNAPSHOT_ENABLED', snapshot)
+    monkeypatch.setitem(app.config, 'SEARCH_MAX_RESULTS', 2)
+    suffix = 'snapshot' if snapshot else 'sql'
+    with app.app_context():
+        # Compatible donors next door, the exact match a few km away
+        make_donor(f'search-near-1-{suffix}', blood_group='O-', lat=lat, lon=lon + 0.001)
+        make_donor(f'search-near-2-{suffix}', blood_group='O-', lat=lat, lon=lon + 0.002)
+        make_donor(f'search-exact-{suffix}', blood_group='A-', lat=lat, lon=lon + 0.05)
+        db.session.commit()
+
+    with app.test_client() as client:
+        response = client.post('/search-donors', data={
+            'blood_group': 'A-', 'include_compatible': '1', 'radius': '10',
+            'user_lat': str(lat), 'user_lon': str(lon),
+        })
+    page = response.get_data(as_text=True)
+    assert f'search-exact-{suffix}' in page
+    assert page.index(f'search-exact-{suffix}') < page.index(f'search-near-1-{suffix}')
+    assert f'search-near-2-{suffix}' not in page
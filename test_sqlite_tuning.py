@@ -0,0 +1,65 @@
+import threading
+
+from sqlalchemy import event
+
+from app import app, db, Donor
+from sqlite_tuning import write_transactions
+
+
+def test_connections_use_configured_pragmas():
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == app.config['SQLITE_PRAGMAS']['busy_timeout']
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+
+
+def test_concurrent_writers_do_not_hit_locked_database():
+    with app.app_context():
+        donors = [Donor(name=f'writer{i}', email=f'writer{i}@test', password='x', age=30, gender='M',
+                        blood_group='A+', location='Hubli', contact='1') for i in range(8)]
+        db.session.add_all(donors)
+        db.session.commit()
+        donor_ids = [donor.id for donor in donors]
+
+    failures = []
+
+    def toggle(donor_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['role'] = 'donor'
+            sess['user_id'] = donor_id
+        for _ in range(20):
+            response = client.post('/toggle-availability')
+            if response.status_code != 302:
+                failures.append(response.status_code)
+
+    threads = [threading.Thread(target=toggle, args=(donor_id,)) for donor_id in donor_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+
+    # 20 toggles each: every donor is back to available, and the counters agree
+    with app.app_context():
+        assert Donor.query.filter(Donor.id.in_(donor_ids), Donor.availability == True).count() == len(donor_ids)
+
+
+def test_background_writers_take_the_write_lock_up_front():
+    begins = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('BEGIN'):
+            begins.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('SELECT 1')
+            with write_transactions(), db.engine.begin() as conn:
+                conn.exec_driver_sql('SELECT 1')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    assert begins == ['BEGIN', 'BEGIN IMMEDIATE']
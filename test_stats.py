@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from app import app, Donor, Receiver, BloodRequest, DonationResponse, read_stats, rebuild_stats
+
+
+def live_stats():
+    with app.app_context():
+        return {key: value for key, value in read_stats().items() if value}
+
+
+def rebuilt_stats():
+    with app.app_context():
+        return {key: value for key, value in rebuild_stats().items() if value}
+
+
+def login(client, role, user_id):
+    with client.session_transaction() as sess:
+        sess['role'] = role
+        sess['user_id'] = user_id
+
+
+def test_write_paths_keep_stats_in_step():
+    client = app.test_client()
+    rebuilt_stats()
+
+    for name, role in (('stats-donor', 'donor'), ('stats-receiver', 'receiver')):
+        client.post('/signup', data={
+            'name': name, 'email': f'{name}@test', 'password': 'x', 'role': role, 'location': 'Hubli',
+            'contact': '1', 'age': '30', 'gender': 'F', 'blood_group': 'O-'
+        })
+    with app.app_context():
+        donor_id = Donor.query.filter_by(email='stats-donor@test').one().id
+        receiver_id = Receiver.query.filter_by(email='stats-receiver@test').one().id
+
+    login(client, 'donor', donor_id)
+    client.post('/toggle-availability')
+
+    login(client, 'receiver', receiver_id)
+    for urgency in ('Critical', 'High', 'Normal'):
+        client.post('/create-request', data={
+            'requesting_for': 'myself', 'blood_group_needed': 'A+', 'quantity_needed': '1 unit',
+            'urgency': urgency, 'hospital_name': 'KIMS', 'hospital_location': 'Hubli',
+            'needed_by_date': (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d'),
+            'contact_person': 'stats', 'contact_number': '1'
+        })
+    with app.app_context():
+        request_ids = [r.id for r in BloodRequest.query.filter_by(receiver_id=receiver_id).order_by(BloodRequest.id)]
+
+    login(client, 'donor', donor_id)
+    for request_id in request_ids:
+        client.post(f'/respond-to-request/{request_id}', data={'action': 'accept'})
+    client.post(f'/respond-to-request/{request_ids[0]}', data={'action': 'reject'})
+    assert live_stats() == rebuilt_stats()
+
+    with app.app_context():
+        response_id = DonationResponse.query.filter_by(request_id=request_ids[1], donor_id=donor_id).one().id
+    login(client, 'receiver', receiver_id)
+    client.post(f'/manage-donor-response/{response_id}', data={'action': 'confirm'})
+    client.post(f'/delete-request/{request_ids[0]}')
+    assert live_stats() == rebuilt_stats()
+
+    before = live_stats()
+    client.post('/clear-all-requests')
+    after = live_stats()
+    assert after == rebuilt_stats()
+    assert after.get('requests.total', 0) == before['requests.total'] - 2
+    assert after.get('requests.by_status.Fulfilled', 0) == before['requests.by_status.Fulfilled'] - 1
+
+
+def test_stats_endpoint():
+    stats = app.test_client().get('/api/stats').get_json()
+    assert set(stats) >= {'donors', 'receivers', 'requests', 'responses'}
+    assert stats['donors']['total'] == sum(stats['donors']['by_blood_group'].values())
@@ -0,0 +1,17 @@
+"""
+WSGI entry point
+
+    gunicorn --workers 2 --threads 4 wsgi:app      (Linux/macOS)
+    waitress-serve --threads 4 wsgi:app            (Windows)
+
+Configuration comes from the environment: DATABASE_URL, SECRET_KEY,
+DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+WEB_PROCESSES/WEB_THREADS (pool and snapshot sizing), DONOR_SNAPSHOT_MAX_AGE
+and PASSWORD_HASH_METHOD. run.py picks a server and passes these through.
+Run `python migrations.py` once per deployment before starting workers
+(run.py does).
+"""
+
+from app import warm_up
+
+app = application = warm_up()